@@ -6,6 +6,12 @@ import platform
 import glob
 import os
 import json
+import struct
+import functools
+import collections
+import sys
+import tempfile
+import threading
 
 def clear_screen():
     """Clear the terminal screen"""
@@ -14,6 +20,7 @@ def clear_screen():
 # Configuration
 COM_PORT = '/dev/ttyUSB0'
 BAUD_RATE = 115200
+SERIAL_WRITE_TIMEOUT = 0.5  # A wedged module raises instead of blocking the writer forever
 WIDTH = 9
 HEIGHT = 34
 TIME_WIDTH = 9
@@ -26,6 +33,9 @@ FADE_SPEED = 0.01
 PULSE_SPEED_MODIFIER = 2.0
 CMD_STAGE_COL = 0x07
 CMD_FLUSH_COLS = 0x08
+CMD_DRAW_BW = 0x06  # Whole 9x34 frame as a packed on/off bitmap
+CMD_SLEEP = 0x03  # 1 = sleep (LEDs off, frame kept), 0 = wake
+BW_FRAME_BYTES = (WIDTH * HEIGHT + 7) // 8  # 39
 
 # Runtime settings (can be changed via menu)
 settings = {
@@ -41,40 +51,653 @@ settings = {
     'music_scroll_speed': 1,  # Scroll speed for track names
     'start_dimmed': False,  # Whether to start the program already dimmed
     'startup_battery_brightness': 255,  # Default startup brightness for battery LED
-    'startup_time_brightness': 255  # Default startup brightness for time LED
+    'startup_time_brightness': 255,  # Default startup brightness for time LED
+    'idle_source': 'auto',  # What counts as activity for auto-dim: auto, input, logind or menu
+    'left_mode': 'battery',  # Left LED content when no music plays: battery or cpu
+    'music_visualizer': 'text',  # While music plays: text (artist/title), spectrum, span (both modules) or art
+    'audio_source': 'monitor',  # Spectrum input: monitor (PipeWire/PulseAudio), a WAV/raw file, or - for stdin
+    'module_sleep_timeout': 0,  # Seconds blank/unchanged before a module sleeps (0 = never)
+    'eco_mode': False,  # Throttle the monitor itself while on battery
+    'eco_cpu_budget': 1.0,  # Eco mode target: percent of one core, including spawned helpers
+    'module_roles': {},  # Extra LED matrices: port -> battery, time (mirror), cpu or off
+    'span_gap': 0,  # Hidden columns between the modules when content spans both
+    'notifications_enabled': False,  # Scroll desktop notifications across the LEDs
+    'transition': 'fade',  # Switching display modes: fade, wipe or off
+    'transition_frames': 6,  # Frames a mode switch takes
+    'log_target': 'file'  # Where diagnostics are flushed: file, journald or off
 }
 
 # Settings file path
 SETTINGS_FILE = os.path.expanduser("~/.led_battery_monitor_settings.json")
+SETTINGS_SAVE_DELAY = 0.5  # Seconds to coalesce bursts of menu changes into one write
+SETTINGS_WATCH_INTERVAL = 2.0  # Seconds between mtime checks for external edits
+
+class SettingsStore:
+    """Debounced, atomic persistence for the settings dict with mtime hot reload
+
+    save() only arms a timer, so a burst of menu changes ends up as a single
+    write (temp file + rename, never a half-written file). A watcher thread
+    stats the file every few seconds and merges external edits into the live
+    dict, which the running monitor picks up on its next frame.
+    """
+
+    def __init__(self, path, data, save_delay=SETTINGS_SAVE_DELAY, watch_interval=SETTINGS_WATCH_INTERVAL):
+        self.path = path
+        self.data = data
+        self.save_delay = save_delay
+        self.watch_interval = watch_interval
+        self.lock = threading.Lock()
+        self.save_timer = None
+        self.file_signature = None  # (mtime_ns, size) of the last version we wrote or read
+        self.file_values = {}  # Contents of that version, to tell which keys an edit touched
+        self.watch_stop = threading.Event()
+        self.watch_thread = None
+        self.on_reload = None
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _merge(self, loaded_settings, previous_values):
+        for key, value in loaded_settings.items():
+            # Unknown keys are ignored so the dict never grows under a reader iterating it
+            if key not in self.data or (key in previous_values and previous_values[key] == value):
+                continue
+            current = self.data[key]
+            # Skip type changes so a typo in the file can't crash the render loop
+            if current is None or isinstance(value, type(current)) or (
+                    isinstance(current, float) and isinstance(value, int) and not isinstance(value, bool)):
+                self.data[key] = value
+
+    def load(self):
+        """Read the file into the settings dict; returns True if it existed"""
+        with self.lock:
+            if not os.path.exists(self.path):
+                return False
+            with open(self.path, 'r') as f:
+                loaded_settings = json.load(f)
+            self._merge(loaded_settings, {})
+            self.file_signature = self._signature()
+            self.file_values = loaded_settings
+            return True
+
+    def save(self):
+        """Schedule a write; repeated calls within save_delay collapse into one"""
+        with self.lock:
+            if self.save_timer is not None:
+                self.save_timer.cancel()
+            self.save_timer = threading.Timer(self.save_delay, self._flush_in_background)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def _flush_in_background(self):
+        # Timer thread: nobody to raise to, and the menu owns the terminal
+        try:
+            self.flush()
+        except Exception as e:
+            log('error', f"Could not save settings to {self.path}: {e}", key='settings-save')
+
+    def flush(self):
+        """Write pending changes now (atomically)"""
+        with self.lock:
+            if self.save_timer is not None:
+                self.save_timer.cancel()
+                self.save_timer = None
+            snapshot = dict(self.data)
+            directory = os.path.dirname(self.path) or '.'
+            fd, tmp_path = tempfile.mkstemp(prefix='.led_battery_monitor_settings.', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(snapshot, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except Exception:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+            self.file_signature = self._signature()
+            self.file_values = snapshot
+
+    def check_for_changes(self):
+        """Reload if the file was changed by someone else; returns True if reloaded"""
+        signature = self._signature()
+        if signature is None or signature == self.file_signature:
+            return False
+        try:
+            with open(self.path, 'r') as f:
+                loaded_settings = json.load(f)
+        except (OSError, ValueError):
+            return False  # Mid-write or invalid - try again on the next change
+        with self.lock:
+            # Only apply keys the edit actually changed, so e.g. the startup brightness
+            # override isn't clobbered
+            self._merge(loaded_settings, self.file_values)
+            self.file_signature = signature
+            self.file_values = loaded_settings
+        if self.on_reload:
+            self.on_reload()
+        return True
+
+    def start_watching(self, on_reload=None):
+        if self.watch_thread is not None:
+            return
+        self.on_reload = on_reload
+        self.watch_stop.clear()
+
+        def watch_loop():
+            while not self.watch_stop.wait(self.watch_interval):
+                self.check_for_changes()
+
+        self.watch_thread = threading.Thread(target=watch_loop, daemon=True)
+        self.watch_thread.start()
+
+    def stop_watching(self):
+        self.watch_stop.set()
+        self.watch_thread = None
+
+settings_store = SettingsStore(SETTINGS_FILE, settings)
 
 def load_settings():
-    global settings
     try:
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r') as f:
-                loaded_settings = json.load(f)
-            settings.update(loaded_settings)
+        if settings_store.load():
             print(f"✓ Settings loaded from {SETTINGS_FILE}")
             print(f"  Battery brightness: {settings['battery_brightness']}")
             print(f"  Time brightness: {settings['time_brightness']}")
             print(f"  Auto-dim: {settings['dim_timeout']}s → {settings['auto_dim_level']}%")
         else:
             print(f"No settings file found, using defaults")
-            save_settings()
+            flush_settings()
     except Exception as e:
         print(f"❌ Error loading settings: {e}")
-        save_settings()
+        flush_settings()
 
 def save_settings():
+    """Queue a settings write (coalesced and written atomically in the background)"""
+    publish_render_config()
+    settings_store.save()
+
+def flush_settings():
     try:
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f, indent=2)
+        settings_store.flush()
         print(f"✓ Settings saved to {SETTINGS_FILE}")
     except Exception as e:
         print(f"❌ Error saving settings: {e}")
-        pass
 
-last_activity_time = time.time()
+@functools.lru_cache(maxsize=64)
+def brightness_lut(brightness, dim_percent=100):
+    """256-entry translate table mapping raw pixel values to scaled output"""
+    scale = (brightness / 255.0) * (dim_percent / 100.0)
+    return bytes(max(0, min(255, int(v * scale))) for v in range(256))
+
+class RenderConfig:
+    """Immutable snapshot of the settings the render loop needs
+
+    Built from the settings dict by publish_render_config() and published by
+    rebinding the module-level render_config, so the monitor loop grabs one
+    reference per frame and never sees a half-applied change.
+    """
+
+    __slots__ = (
+        'fps', 'frame_time', 'battery_enabled', 'time_enabled', 'pulse_enabled',
+        'music_enabled', 'music_scroll_speed', 'dim_timeout', 'dim_factor', 'left_mode',
+        'music_visualizer', 'module_sleep_timeout', 'eco_mode', 'eco_cpu_budget', 'span_gap',
+        'notifications_enabled', 'transition', 'transition_frames',
+        'battery_lut', 'time_lut', 'battery_dim_lut', 'time_dim_lut',
+    )
+
+    def __init__(self, source):
+        values = {
+            'fps': max(1, source['fps']),
+            'battery_enabled': bool(source['battery_enabled']),
+            'time_enabled': bool(source['time_enabled']),
+            'pulse_enabled': bool(source['pulse_enabled']),
+            'music_enabled': bool(source['music_enabled']),
+            'music_scroll_speed': source['music_scroll_speed'],
+            'dim_timeout': source['dim_timeout'],
+            'dim_factor': source['auto_dim_level'] / 100.0,
+            'left_mode': source['left_mode'],
+            'music_visualizer': source['music_visualizer'],
+            'module_sleep_timeout': source['module_sleep_timeout'],
+            'eco_mode': bool(source['eco_mode']),
+            'eco_cpu_budget': max(0.1, source['eco_cpu_budget']),
+            'span_gap': max(0, source['span_gap']),
+            'notifications_enabled': bool(source['notifications_enabled']),
+            'transition': source['transition'] if source['transition'] in ('fade', 'wipe') else 'off',
+            'transition_frames': max(1, source['transition_frames']),
+            'battery_lut': brightness_lut(source['battery_brightness']),
+            'time_lut': brightness_lut(source['time_brightness']),
+            'battery_dim_lut': brightness_lut(source['battery_brightness'], source['auto_dim_level']),
+            'time_dim_lut': brightness_lut(source['time_brightness'], source['auto_dim_level']),
+        }
+        values['frame_time'] = 1.0 / values['fps']
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RenderConfig is immutable - call publish_render_config()")
+
+render_config = RenderConfig(settings)
+
+def publish_render_config():
+    """Recompile the settings dict and swap it in for the render loop"""
+    global render_config
+    render_config = RenderConfig(settings)
+
+class SystemClock:
+    """Wall/monotonic time and sleeping, as used by the render loop and its sensors"""
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+class SimulatedClock:
+    """Virtual time for simulations: sleep() advances it instantly
+
+    With speed set, sleep() also waits seconds / speed of real time (e.g.
+    speed=1000 to watch a simulation play back); speed=None runs as fast as
+    the render code allows and is fully deterministic.
+    """
+
+    def __init__(self, start=1700000000.0, speed=None):
+        self.start = start
+        self.now = start
+        self.speed = speed
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now - self.start
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+            if self.speed:
+                time.sleep(seconds / self.speed)
+
+    advance = sleep
+
+clock = SystemClock()  # Swapped for a SimulatedClock by run_simulation()
+
+# Diagnostics from the render/sensor threads go to a ring buffer, never straight to stdout
+LOG_FILE = os.path.expanduser("~/.led_battery_monitor.log")
+LOG_RING_SIZE = 256
+LOG_REPEAT_INTERVAL = 30.0  # Seconds before the same message is stored again
+LOG_FLUSH_INTERVAL = 5.0
+JOURNAL_SOCKET = '/run/systemd/journal/socket'
+LOG_PRIORITIES = {'error': 3, 'warning': 4, 'info': 6, 'debug': 7}
+
+class LogRing:
+    """Bounded in-memory log with per-message rate limiting
+
+    log() only appends to a deque (atomic under the GIL, so callers never take
+    a lock or wait on I/O). A message repeated within repeat_interval is counted
+    instead of stored; the next copy that gets through says how many were
+    dropped. flush() writes out everything new to the log file or journald.
+    """
+
+    def __init__(self, size=LOG_RING_SIZE, repeat_interval=LOG_REPEAT_INTERVAL):
+        self.entries = collections.deque(maxlen=size)
+        self.repeat_interval = repeat_interval
+        self.last_seen = {}  # key -> [when last stored, copies suppressed since]
+        self.counter = iter(range(1, sys.maxsize))
+        self.flushed = 0  # Sequence number of the last entry written out
+
+    def log(self, level, message, key=None):
+        """Record a message; returns False if it was folded into an earlier copy"""
+        key = (level, message) if key is None else key
+        now = clock.monotonic()
+        seen = self.last_seen.get(key)
+        if seen is not None and now - seen[0] < self.repeat_interval:
+            seen[1] += 1
+            return False
+        if len(self.last_seen) >= self.entries.maxlen * 4:
+            self.last_seen.clear()  # Keys with variable text mustn't grow this forever
+        self.last_seen[key] = [now, 0]
+        self.entries.append((next(self.counter), clock.time(), level, message, seen[1] if seen else 0))
+        return True
+
+    def recent(self, count=None):
+        entries = list(self.entries)
+        if count is not None:
+            entries = entries[-count:] if count > 0 else []
+        return [{'time': when, 'level': level, 'message': message, 'repeated': repeated}
+                for _, when, level, message, repeated in entries]
+
+    def flush(self, target='file', path=LOG_FILE):
+        """Write entries logged since the last flush; returns how many were written"""
+        pending = [entry for entry in list(self.entries) if entry[0] > self.flushed]
+        if not pending or target == 'off':
+            if pending:
+                self.flushed = pending[-1][0]
+            return 0
+        if target == 'journald' and not self._send_to_journal(pending):
+            target = 'file'  # No journal (e.g. not systemd) - don't lose them
+        if target != 'journald':
+            with open(path, 'a') as f:
+                for _, when, level, message, repeated in pending:
+                    stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(when))
+                    suffix = f" (repeated {repeated} times)" if repeated else ""
+                    f.write(f"{stamp} {level.upper()} {message}{suffix}\n")
+        self.flushed = pending[-1][0]
+        return len(pending)
+
+    def _send_to_journal(self, entries):
+        import socket
+
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                for _, _, level, message, repeated in entries:
+                    suffix = f" (repeated {repeated} times)" if repeated else ""
+                    text = (message + suffix).replace('\n', ' ')
+                    sock.sendto(f"PRIORITY={LOG_PRIORITIES.get(level, 6)}\n"
+                                f"SYSLOG_IDENTIFIER=led-battery-monitor\n"
+                                f"MESSAGE={text}\n".encode(), JOURNAL_SOCKET)
+        except OSError:
+            return False
+        return True
+
+log_ring = LogRing()
+
+def log(level, message, key=None):
+    """Log a diagnostic without blocking (see LogRing)"""
+    return log_ring.log(level, message, key)
+
+last_activity_time = clock.time()
+forced_dim = False  # Set by "dim now"; cleared by the next user activity
+idle_hint = False  # Session idle as reported by logind
+
+def register_activity(when=None):
+    """Record user activity (menu input, keyboard/mouse events, control socket)"""
+    global last_activity_time, forced_dim
+    last_activity_time = clock.time() if when is None else when
+    forced_dim = False
+
+def set_idle_hint(idle):
+    """logind says the session went idle (dim) or came back (counts as activity)"""
+    global idle_hint
+    idle_hint = idle
+    if not idle:
+        register_activity()
+
+def escape_bus_label(label):
+    """Escape a string the way logind does for object path components"""
+    escaped = ''
+    for i, ch in enumerate(label):
+        if (ch.isascii() and ch.isalpha()) or (ch.isdigit() and i > 0):
+            escaped += ch
+        else:
+            escaped += f"_{ord(ch):02x}"
+    return escaped or '_'
+
+INPUT_RESCAN_INTERVAL = 5.0  # Seconds between looks for newly plugged-in keyboards/mice
+EV_KEY, EV_REL, EV_ABS = 0x01, 0x02, 0x03
+BTN_LEFT, BTN_TOUCH = 0x110, 0x14a
+TYPING_KEYS = range(1, 89)  # KEY_ESC .. KEY_F12: letters, digits, modifiers - not power/brightness keys
+
+def read_input_bits(event_name, kind):
+    """Capability bitmask of /dev/input/<event_name> ('ev', 'key', ...) as an int, 0 if unknown
+
+    sysfs prints it as space-separated hex words of one C long, most significant first.
+    """
+    try:
+        with open(f"/sys/class/input/{event_name}/device/capabilities/{kind}") as f:
+            words = f.read().split()
+    except OSError:
+        return 0
+    bits = 0
+    word_bits = struct.calcsize('l') * 8
+    for word in words:
+        bits = (bits << word_bits) | int(word, 16)
+    return bits
+
+def is_user_input_device(event_name):
+    """True for keyboards, mice, touchpads and touchscreens
+
+    Lid/power switches, the ACPI "Video Bus" (brightness keys), sensor hubs
+    and the like also produce events but aren't someone at the keyboard.
+    """
+    ev = read_input_bits(event_name, 'ev')
+    if not ev >> EV_KEY & 1:
+        return False
+    keys = read_input_bits(event_name, 'key')
+    if any(keys >> code & 1 for code in TYPING_KEYS):
+        return True
+    pointer = keys >> BTN_LEFT & 1 or keys >> BTN_TOUCH & 1
+    return bool(pointer and (ev >> EV_REL & 1 or ev >> EV_ABS & 1))
+
+class InputIdleSource:
+    """Any event on a keyboard/mouse/touch /dev/input/event* device counts as activity
+
+    Needs read access to the devices (usually the 'input' group). Devices
+    are filtered by their capabilities (see is_user_input_device), and
+    rescan() picks up ones plugged in after start.
+    """
+
+    EVENT_GLOB = '/dev/input/event*'
+
+    def __init__(self, paths=None):
+        self.paths = paths  # Explicit device list (no capability filter)
+        self.fds = {}  # path -> fd
+
+    def open(self):
+        return self.rescan()
+
+    def rescan(self):
+        """Open devices we aren't watching yet; returns the new fds"""
+        if self.paths is not None:
+            paths = [path for path in self.paths if path not in self.fds]
+        else:
+            paths = [path for path in sorted(glob.glob(self.EVENT_GLOB))
+                     if path not in self.fds and is_user_input_device(os.path.basename(path))]
+        opened = []
+        for path in paths:
+            try:
+                self.fds[path] = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            except OSError:
+                continue
+            opened.append(self.fds[path])
+        return opened
+
+    def handle(self, fd, watcher):
+        # Drain whatever is queued; we only care that something happened
+        try:
+            while os.read(fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        except OSError:
+            # Device unplugged - forget it so a replug is picked up by rescan()
+            for path, open_fd in list(self.fds.items()):
+                if open_fd == fd:
+                    del self.fds[path]
+            os.close(fd)
+            return False
+        watcher.on_activity()
+        return True
+
+    def close(self):
+        for fd in self.fds.values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.fds = {}
+
+class LogindIdleSource:
+    """Follow the session's IdleHint via a single long-lived dbus-monitor"""
+
+    def __init__(self, session_id=None):
+        self.session_id = session_id if session_id is not None else os.environ.get('XDG_SESSION_ID')
+        self.process = None
+        self.buffer = b''
+        self.expect_value = False
+
+    def open(self):
+        import subprocess
+        import shutil
+
+        if not shutil.which('dbus-monitor'):
+            return []
+        match = ("type='signal',sender='org.freedesktop.login1',"
+                 "interface='org.freedesktop.DBus.Properties',member='PropertiesChanged'")
+        if self.session_id:
+            match += f",path='/org/freedesktop/login1/session/{escape_bus_label(self.session_id)}'"
+        try:
+            self.process = subprocess.Popen(['dbus-monitor', '--system', match],
+                                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError:
+            return []
+        os.set_blocking(self.process.stdout.fileno(), False)
+        return [self.process.stdout]
+
+    def handle(self, stream, watcher):
+        try:
+            data = os.read(stream.fileno(), 4096)
+        except BlockingIOError:
+            return True
+        if not data:
+            return False  # dbus-monitor exited
+        self.buffer += data
+        while b'\n' in self.buffer:
+            line, self.buffer = self.buffer.split(b'\n', 1)
+            if b'"IdleHint"' in line:
+                self.expect_value = True
+            elif self.expect_value and b'boolean' in line:
+                self.expect_value = False
+                watcher.on_idle_hint(b'true' in line)
+        return True
+
+    def close(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process = None
+
+class FakeIdleSource:
+    """Scriptable idle source for tests; events go through the same selector path"""
+
+    def __init__(self):
+        self.read_fd = None
+        self.write_fd = None
+
+    def open(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        return [self.read_fd]
+
+    def emit_activity(self):
+        os.write(self.write_fd, b'a')
+
+    def emit_idle_hint(self, idle):
+        os.write(self.write_fd, b'i' if idle else b'b')
+
+    def handle(self, fd, watcher):
+        try:
+            events = os.read(fd, 4096)
+        except BlockingIOError:
+            return True
+        for event in events:
+            if event == ord('a'):
+                watcher.on_activity()
+            else:
+                watcher.on_idle_hint(event == ord('i'))
+        return True
+
+    def close(self):
+        for fd in (self.read_fd, self.write_fd):
+            if fd is not None:
+                os.close(fd)
+        self.read_fd = self.write_fd = None
+
+def default_idle_sources(mode=None):
+    """Idle sources for the 'idle_source' setting: auto, input, logind or menu"""
+    mode = mode or settings.get('idle_source', 'auto')
+    sources = []
+    if mode in ('auto', 'input'):
+        sources.append(InputIdleSource())
+    if mode in ('auto', 'logind'):
+        sources.append(LogindIdleSource())
+    return sources
+
+class IdleWatcher:
+    """Multiplex idle sources with selectors on one thread
+
+    Sources only push events (activity / idle hint), so the render loop never
+    polls anything - check_dim_timeout() just compares a timestamp. Sources
+    with a rescan() method are asked for new files every INPUT_RESCAN_INTERVAL.
+    """
+
+    def __init__(self, sources, on_activity=None, on_idle_hint=None):
+        self.sources = sources
+        self.on_activity = on_activity or register_activity
+        self.on_idle_hint = on_idle_hint or set_idle_hint
+        self.selector = None
+        self.thread = None
+        self.running = False
+        self.wake_read = None
+        self.wake_write = None
+
+    def start(self):
+        import selectors
+
+        self.selector = selectors.DefaultSelector()
+        active = 0
+        for source in self.sources:
+            for fileobj in source.open():
+                self.selector.register(fileobj, selectors.EVENT_READ, source)
+                active += 1
+        if not active:
+            self.selector.close()
+            self.selector = None
+            return False  # Nothing usable - fall back to menu activity only
+
+        self.wake_read, self.wake_write = os.pipe()
+        self.selector.register(self.wake_read, selectors.EVENT_READ, None)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return True
+
+    def _run(self):
+        import selectors
+
+        next_rescan = time.monotonic() + INPUT_RESCAN_INTERVAL
+        while self.running:
+            for key, _ in self.selector.select(max(0.0, next_rescan - time.monotonic())):
+                if key.data is None:
+                    return  # Woken up by stop()
+                if not key.data.handle(key.fileobj, self):
+                    self.selector.unregister(key.fileobj)
+            if time.monotonic() >= next_rescan:
+                next_rescan = time.monotonic() + INPUT_RESCAN_INTERVAL
+                for source in self.sources:
+                    rescan = getattr(source, 'rescan', None)
+                    for fileobj in (rescan() if rescan else []):
+                        self.selector.register(fileobj, selectors.EVENT_READ, source)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        os.write(self.wake_write, b'x')
+        self.thread.join(timeout=1.0)
+        self.selector.close()
+        for source in self.sources:
+            source.close()
+        os.close(self.wake_read)
+        os.close(self.wake_write)
 
 def get_spotify_info():
     """Get currently playing Spotify track info via MPRIS"""
@@ -111,6 +734,7 @@ def get_spotify_info():
         artist = ''
         track = ''
         length_us = 0  # Track length in microseconds
+        art_url = ''
         
         for i, line in enumerate(lines):
             if 'xesam:artist' in line:
@@ -125,6 +749,11 @@ def get_spotify_info():
                     if 'string' in lines[j] and lines[j].strip():
                         track = lines[j].split('"')[1] if '"' in lines[j] else ''
                         break
+            elif 'mpris:artUrl' in line:
+                for j in range(i+1, min(i+3, len(lines))):
+                    if 'string' in lines[j] and '"' in lines[j]:
+                        art_url = lines[j].split('"')[1]
+                        break
             elif 'mpris:length' in line:
                 # Get track length
                 for j in range(i+1, min(i+3, len(lines))):
@@ -164,12 +793,148 @@ def get_spotify_info():
             'status': 'playing',
             'artist': artist,
             'track': track,
-            'progress': progress
+            'progress': progress,
+            'art_url': art_url
         }
         
     except (subprocess.TimeoutExpired, subprocess.CalledProcessError, Exception):
         return None
 
+def read_power_supply_value(battery_path, name):
+    """Read a single sysfs power_supply attribute, or None if missing/unreadable"""
+    try:
+        with open(os.path.join(battery_path, name), 'r') as f:
+            value = f.read().strip()
+    except (OSError, ValueError):
+        return None
+    if name == 'status':
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+class BatteryEstimator:
+    """Streaming time-remaining estimator fed from sysfs battery values
+
+    Power draw is smoothed with a time-constant EWMA so every sample is O(1)
+    regardless of fps, and remaining/missing energy comes from the battery's
+    real energy_now/energy_full (or charge_* x voltage) instead of a guess.
+    """
+
+    def __init__(self, time_constant=30.0):
+        self.time_constant = time_constant  # Seconds for the EWMA to settle ~63%
+        self.reset()
+
+    def reset(self):
+        self.smoothed_watts = None
+        self.last_sample_time = None
+        self.status = None
+        self.energy_now_wh = None
+        self.energy_full_wh = None
+        self.power_watts = 0.0
+
+    @property
+    def has_capacity(self):
+        return self.energy_now_wh is not None and bool(self.energy_full_wh)
+
+    def update(self, power_watts, energy_now_wh, energy_full_wh, status, now=None):
+        """Feed one sample; returns the smoothed power in watts"""
+        now = clock.time() if now is None else now
+        if status != self.status:
+            # Direction changed - old draw says nothing about the new one
+            self.smoothed_watts = None
+            self.status = status
+        self.power_watts = power_watts
+        self.energy_now_wh = energy_now_wh
+        self.energy_full_wh = energy_full_wh
+
+        if power_watts <= 0:
+            return self.smoothed_watts
+        if self.smoothed_watts is None or self.last_sample_time is None:
+            self.smoothed_watts = power_watts
+        else:
+            dt = max(0.0, now - self.last_sample_time)
+            alpha = 1.0 - math.exp(-dt / self.time_constant)
+            self.smoothed_watts += alpha * (power_watts - self.smoothed_watts)
+        self.last_sample_time = now
+        return self.smoothed_watts
+
+    def sample(self, battery_path, now=None):
+        """Read sysfs for one battery and update; returns instantaneous power in watts"""
+        voltage_uv = read_power_supply_value(battery_path, 'voltage_now')
+        voltage_v = voltage_uv / 1000000.0 if voltage_uv else None
+
+        power_uw = read_power_supply_value(battery_path, 'power_now')
+        if power_uw is not None:
+            power_watts = abs(power_uw) / 1000000.0  # µW to W
+        else:
+            current_ua = read_power_supply_value(battery_path, 'current_now')
+            if current_ua is not None and voltage_v:
+                power_watts = abs(current_ua) / 1000000.0 * voltage_v  # µA * V
+            else:
+                power_watts = 0.0
+
+        energy_now = read_power_supply_value(battery_path, 'energy_now')
+        energy_full = read_power_supply_value(battery_path, 'energy_full')
+        if energy_now is not None and energy_full:
+            energy_now_wh = energy_now / 1000000.0  # µWh to Wh
+            energy_full_wh = energy_full / 1000000.0
+        else:
+            charge_now = read_power_supply_value(battery_path, 'charge_now')
+            charge_full = read_power_supply_value(battery_path, 'charge_full')
+            if charge_now is not None and charge_full and voltage_v:
+                energy_now_wh = charge_now / 1000000.0 * voltage_v  # µAh * V
+                energy_full_wh = charge_full / 1000000.0 * voltage_v
+            else:
+                energy_now_wh = None
+                energy_full_wh = None
+
+        status = read_power_supply_value(battery_path, 'status')
+        self.update(power_watts, energy_now_wh, energy_full_wh, status, now)
+        return power_watts
+
+    def _minutes(self, energy_wh):
+        if energy_wh is None or not self.smoothed_watts:
+            return None
+        hours = max(0.0, energy_wh) / self.smoothed_watts
+        return max(1, min(1440, int(hours * 60)))  # 1 min to 24 hours
+
+    def time_to_empty(self):
+        """Minutes until empty while discharging, else None"""
+        if self.status != "Discharging" or not self.has_capacity:
+            return None
+        return self._minutes(self.energy_now_wh)
+
+    def time_to_full(self):
+        """Minutes until full while charging, else None"""
+        if self.status != "Charging" or not self.has_capacity:
+            return None
+        return self._minutes(self.energy_full_wh - self.energy_now_wh)
+
+battery_estimator = BatteryEstimator()
+
+def get_upower_time_remaining():
+    """Ask upower for time to empty (only used when sysfs has no capacity data)"""
+    import subprocess
+    try:
+        upower_cmd = "upower -i $(upower -e | grep 'BAT') | grep -E 'time to empty|time to full'"
+        result = subprocess.run(upower_cmd, shell=True, capture_output=True, text=True, timeout=5)
+        if result.returncode == 0 and result.stdout:
+            time_line = result.stdout.strip()
+            if 'time to empty' in time_line:
+                # Parse time like "time to empty:     1.5 hours"
+                time_part = time_line.split(':')[1].strip()
+                if 'hour' in time_part:
+                    hours = float(time_part.split()[0])
+                    return int(hours * 60)
+                elif 'minute' in time_part:
+                    minutes = float(time_part.split()[0])
+                    return int(minutes)
+    except (subprocess.TimeoutExpired, subprocess.CalledProcessError, ValueError, IndexError):
+        pass
+    return None
+
 def get_battery_info():
     """Get battery information cross-platform"""
     battery = psutil.sensors_battery()
@@ -186,141 +951,2799 @@ def get_battery_info():
     
     if platform.system() == "Linux":
         try:
-            # Get time remaining from upower (more reliable than our calculation)
-            import subprocess
-            try:
-                upower_cmd = "upower -i $(upower -e | grep 'BAT') | grep -E 'time to empty|time to full'"
-                result = subprocess.run(upower_cmd, shell=True, capture_output=True, text=True, timeout=5)
-                if result.returncode == 0 and result.stdout:
-                    time_line = result.stdout.strip()
-                    if 'time to empty' in time_line:
-                        # Parse time like "time to empty:     1.5 hours"
-                        time_part = time_line.split(':')[1].strip()
-                        if 'hour' in time_part:
-                            hours = float(time_part.split()[0])
-                            time_remaining_minutes = int(hours * 60)
-                        elif 'minute' in time_part:
-                            minutes = float(time_part.split()[0])
-                            time_remaining_minutes = int(minutes)
-            except (subprocess.TimeoutExpired, subprocess.CalledProcessError, ValueError, IndexError):
-                time_remaining_minutes = None
-            
-            # Read power consumption from /sys/class/power_supply/
+            # Read power and capacity from /sys/class/power_supply/
             battery_paths = glob.glob('/sys/class/power_supply/BAT*')
             if battery_paths:
-                battery_path = battery_paths[0]
-                
-                # Try to read current power consumption
-                power_now_path = os.path.join(battery_path, 'power_now')
-                current_now_path = os.path.join(battery_path, 'current_now')
-                voltage_now_path = os.path.join(battery_path, 'voltage_now')
-                status_path = os.path.join(battery_path, 'status')
-                
-                if os.path.exists(power_now_path):
-                    with open(power_now_path, 'r') as f:
-                        power_now = int(f.read().strip()) / 1000000.0  # Convert µW to W
-                elif os.path.exists(current_now_path) and os.path.exists(voltage_now_path):
-                    with open(current_now_path, 'r') as f:
-                        current_now = int(f.read().strip()) / 1000000.0  # Convert µA to A
-                    with open(voltage_now_path, 'r') as f:
-                        voltage_now = int(f.read().strip()) / 1000000.0  # Convert µV to V
-                    power_now = current_now * voltage_now
-                else:
-                    power_now = 0
+                power_now = battery_estimator.sample(battery_paths[0])
                 
                 # Check if charging or discharging
-                if os.path.exists(status_path):
-                    with open(status_path, 'r') as f:
-                        status = f.read().strip()
-                    
-                    if status == "Charging":
-                        charge_rate = power_now * 1000  # Convert to mW for compatibility
-                        discharge_rate = 0
-                    elif status == "Discharging":
-                        discharge_rate = power_now * 1000  # Convert to mW for compatibility
-                        charge_rate = 0
+                if battery_estimator.status == "Charging":
+                    charge_rate = power_now * 1000  # Convert to mW for compatibility
+                elif battery_estimator.status == "Discharging":
+                    discharge_rate = power_now * 1000  # Convert to mW for compatibility
+            
+            if battery_estimator.has_capacity:
+                time_remaining_minutes = battery_estimator.time_to_empty()
+            else:
+                time_remaining_minutes = get_upower_time_remaining()
+                        
+        except Exception as e:
+            log('error', f"Error reading Linux power info: {e}", key='battery-read')
+            charge_rate = 0
+            discharge_rate = 0
+    
+    return percentage, charge_rate, discharge_rate, time_remaining_minutes
+
+PROVIDER_IDLE_INTERVAL = 1.0  # Seconds between looks at a provider with nothing to do (disabled / no input)
+
+class DataProvider:
+    """A data source sampled by the ProviderScheduler, never on the render path
+
+    Subclasses implement sample() and either set `interval` (seconds between
+    samples) or return a pollable file from fileno() to be sampled whenever it
+    becomes readable. The render loop only ever reads `latest`. Providers that
+    can draw themselves implement render(data) returning WIDTH x HEIGHT columns.
+    """
+
+    name = 'provider'
+    interval = 1.0  # None for purely event-driven providers
+    enabled = True  # Disabled providers keep their schedule but skip sampling
+    throttle = True  # Interval is stretched by the scheduler's interval_scale (eco mode)
+
+    def __init__(self):
+        self.latest = None
+        self.updated_at = None
+        self.samples = 0
+        self.last_error = None
+
+    def open(self):
+        """Called by the scheduler before it starts (e.g. to spawn a capture process)"""
+
+    def close(self):
+        """Called by the scheduler when it stops"""
+
+    def sample(self):
+        """Take one reading for `latest` (on the scheduler thread); subclasses override this"""
+        return None
+
+    def fileno(self):
+        """Event subscription: a file object/descriptor to watch, or None"""
+        return None
+
+    def handle_event(self):
+        """Called when fileno() is readable; default is to take a fresh sample
+
+        Returning False unsubscribes the file (e.g. the helper process exited).
+        """
+        self.refresh()
+
+    def render(self, data):
+        return None
+
+    def refresh(self):
+        try:
+            self.latest = self.sample()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e  # Keep the previous value
+            log('warning', f"{self.name} provider: {e!r}", key=(self.name, type(e).__name__))
+        self.updated_at = clock.monotonic()
+        self.samples += 1
+        return self.latest
+
+class BatteryProvider(DataProvider):
+    name = 'battery'
+    interval = 1.0
+
+    def __init__(self, source=get_battery_info):
+        super().__init__()
+        self.source = source  # Swapped for SimulatedBattery.read by run_simulation()
+
+    def sample(self):
+        return self.source()
+
+class SpotifyProvider(DataProvider):
+    name = 'spotify'
+    interval = 1.0  # Each sample spawns dbus-send, keep it well below frame rate
+
+    def __init__(self, source=get_spotify_info):
+        super().__init__()
+        self.source = source
+
+    def sample(self):
+        return self.source()
+
+class ProviderScheduler:
+    """Run every provider on one thread, only when due, coalescing wakeups
+
+    Providers due within COALESCE_WINDOW of each other run in the same wakeup,
+    and event providers share the same select() call as the timers. Once a
+    second every provider's `enabled` is checked: newly enabled ones are
+    opened and scheduled, disabled ones are closed and parked (no timer, no
+    watched file) - so settings changes apply without restarting monitoring.
+    """
+
+    COALESCE_WINDOW = 0.05
+
+    def __init__(self):
+        self.interval_scale = 1.0  # > 1 samples throttled providers less often
+        self.providers = []
+        self.queue = []  # heap of (due, seq, provider)
+        self.queued = set()  # Providers with a timer in the queue
+        self.opened = set()  # Providers that are open (enabled when last checked)
+        self.watched = {}  # provider -> file object registered with the selector
+        self.seq = 0
+        self.lock = threading.RLock()
+        self.selector = None
+        self.thread = None
+        self.threaded = True
+        self.running = False
+        self.stop_event = threading.Event()  # Per run, so a thread outliving stop() can't join the next run
+        self.next_sync = 0.0
+        self.wake_read = None
+        self.wake_write = None
+
+    def add(self, provider):
+        with self.lock:
+            self.providers.append(provider)
+            if self.running:
+                self._sync(provider, clock.monotonic())
+        if self.running:
+            self._wake()
+        return provider
+
+    def get(self, name):
+        for provider in self.providers:
+            if provider.name == name:
+                return provider
+        return None
+
+    def _schedule(self, provider, due):
+        import heapq
+
+        if provider in self.queued or provider.interval is None:
+            return
+        self.seq += 1
+        self.queued.add(provider)
+        heapq.heappush(self.queue, (due, self.seq, provider))
+
+    def _sync(self, provider, now):
+        """Open or close a provider whose enabled state changed (call with the lock held)"""
+        import selectors
+
+        enabled = provider.enabled
+        if enabled and provider not in self.opened:
+            if provider.interval is None and not self.threaded:
+                return  # Event-only - nothing would ever read it without the thread
+            provider.open()
+            self.opened.add(provider)
+            fileobj = provider.fileno() if self.threaded else None
+            if fileobj is not None:
+                self.selector.register(fileobj, selectors.EVENT_READ, provider)
+                self.watched[provider] = fileobj
+            if provider.interval is not None:
+                provider.refresh()  # So the first frame after enabling has data
+            self._schedule(provider, now + (provider.interval or 0))
+        elif not enabled and provider in self.opened:
+            self._unwatch(provider)
+            provider.close()
+            self.opened.discard(provider)
+
+    def refresh_soon(self, provider):
+        """Sample a timed provider on the scheduler thread as soon as possible"""
+        import heapq
+
+        with self.lock:
+            if provider not in self.opened or provider.interval is None:
+                return
+            self.queue = [entry for entry in self.queue if entry[2] is not provider]
+            heapq.heapify(self.queue)
+            self.queued.discard(provider)
+            self._schedule(provider, clock.monotonic())
+        self._wake()
+
+    def _unwatch(self, provider):
+        fileobj = self.watched.pop(provider, None)
+        if fileobj is not None:
+            try:
+                self.selector.unregister(fileobj)
+            except (KeyError, ValueError):
+                pass
+
+    def _wake(self):
+        with self.lock:
+            if self.wake_write is None:
+                return
+            try:
+                os.write(self.wake_write, b'x')
+            except OSError:
+                pass
+
+    def start(self, threaded=True):
+        """Take one sample of everything (so the first frame has data), then run in background
+
+        With threaded=False nothing runs by itself: the caller drives timed
+        providers through run_due() (simulations), and event-only providers
+        aren't opened at all.
+        """
+        import selectors
+
+        with self.lock:
+            if self.running:
+                return
+            self.selector = selectors.DefaultSelector()
+            self.wake_read, self.wake_write = os.pipe()
+            os.set_blocking(self.wake_read, False)
+            self.selector.register(self.wake_read, selectors.EVENT_READ, None)
+            self.stop_event = threading.Event()
+            self.threaded = threaded
+            now = clock.monotonic()
+            self.queue = []
+            self.queued = set()
+            for provider in self.providers:
+                self._sync(provider, now)
+            self.next_sync = now + PROVIDER_IDLE_INTERVAL
+            self.running = True
+            if threaded:
+                self.thread = threading.Thread(target=self._run, daemon=True,
+                                               args=(self.selector, self.wake_read, self.wake_write, self.stop_event))
+                self.thread.start()
+
+    def _run(self, selector, wake_read, wake_write, stop):
+        """Scheduler thread for one run; it owns that run's selector and wake pipe and closes them"""
+        try:
+            while not stop.is_set():
+                with self.lock:
+                    due = min(self.queue[0][0], self.next_sync) if self.queue else self.next_sync
+                    timeout = max(0.0, due - clock.monotonic())
+                for key, _ in selector.select(timeout):
+                    if stop.is_set():
+                        break
+                    if key.data is None:
+                        try:
+                            os.read(wake_read, 4096)
+                        except BlockingIOError:
+                            pass
+                    elif key.data.handle_event() is False:
+                        with self.lock:
+                            if not stop.is_set():
+                                self._unwatch(key.data)
+                if stop.is_set():
+                    break
+                self.run_due(stop)
+        finally:
+            with self.lock:
+                if self.wake_write == wake_write:
+                    self.wake_write = None  # Died on its own - don't let _wake() write to a recycled fd
+                selector.close()
+                os.close(wake_read)
+                os.close(wake_write)
+
+    def run_due(self, stop=None):
+        """Sample every timed provider that is due now (and apply enabled changes)"""
+        import heapq
+
+        stop = self.stop_event if stop is None else stop
+        now = clock.monotonic()
+        due = []
+        with self.lock:
+            if stop.is_set():
+                return  # A thread left over from a stopped run must not touch the next one
+            if now >= self.next_sync:
+                self.next_sync = now + PROVIDER_IDLE_INTERVAL
+                for provider in self.providers:
+                    self._sync(provider, now)
+            while self.queue and self.queue[0][0] <= now + self.COALESCE_WINDOW:
+                due.append(heapq.heappop(self.queue))
+            for _, _, provider in due:
+                self.queued.discard(provider)
+        for when, _, provider in due:
+            if provider.enabled and provider in self.opened and not stop.is_set():
+                provider.refresh()
+        with self.lock:
+            if stop.is_set():
+                return
+            for when, _, provider in due:
+                interval = provider.interval
+                if interval is None or provider not in self.opened or provider in self.queued:
+                    continue  # Parked (disabled) or now event-driven
+                interval *= self.interval_scale if provider.throttle else 1.0
+                # Skip missed slots instead of bursting to catch up
+                self.seq += 1
+                self.queued.add(provider)
+                heapq.heappush(self.queue, (max(when + interval, now), self.seq, provider))
+
+    def stop(self):
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+            self.stop_event.set()
+            self._wake()
+            thread, self.thread = self.thread, None
+            if thread is None:
+                self.selector.close()
+                os.close(self.wake_read)
+                os.close(self.wake_write)
+            self.selector = None
+            self.wake_read = self.wake_write = None
+            self.queue = []
+            self.queued = set()
+            self.opened = set()
+            self.watched = {}
+        if thread is not None:
+            # A sampler stuck in a slow helper may outlive this; the thread then
+            # sees its run's stop event and cleans up after itself
+            thread.join(timeout=2.0)
+        for provider in self.providers:
+            provider.close()
+
+class ProcStatReader:
+    """Per-core CPU load from deltas of a kept-open /proc/stat
+
+    Much cheaper than psutil.cpu_percent(percpu=True) at 10-30 reads a second:
+    one seek + readinto into a reused buffer and in-place counter updates.
+    """
+
+    def __init__(self, path='/proc/stat'):
+        self.file = open(path, 'rb', buffering=0)
+        self.buffer = bytearray(65536)
+        self.prev_idle = []
+        self.prev_total = []
+        self.loads = []
+
+    def read(self):
+        """Return a list of per-core loads (0.0-1.0) since the previous read"""
+        self.file.seek(0)
+        size = self.file.readinto(self.buffer)
+        core = 0
+        for line in self.buffer[:size].split(b'\n'):
+            if not line.startswith(b'cpu') or line[3:4] == b' ':
+                if core:
+                    break  # Per-core lines are contiguous; skip intr/ctxt/etc.
+                continue
+            fields = line.split()
+            # user nice system idle iowait irq softirq steal (guest time is already in user)
+            values = [int(v) for v in fields[1:9]]
+            idle = values[3] + values[4]
+            total = sum(values)
+            if core >= len(self.prev_total):
+                self.prev_idle.append(idle)
+                self.prev_total.append(total)
+                self.loads.append(0.0)
+            else:
+                d_total = total - self.prev_total[core]
+                if d_total > 0:
+                    self.loads[core] = 1.0 - (idle - self.prev_idle[core]) / d_total
+                self.prev_idle[core] = idle
+                self.prev_total[core] = total
+            core += 1
+        return self.loads[:core]
+
+    def close(self):
+        self.file.close()
+
+class CpuProvider(DataProvider):
+    name = 'cpu'
+
+    def __init__(self):
+        super().__init__()
+        self.reader = None
+
+    @property
+    def enabled(self):
+        return render_config.left_mode == 'cpu' or device_pool.has_role('cpu')
+
+    @property
+    def interval(self):
+        if not self.enabled:
+            return PROVIDER_IDLE_INTERVAL
+        # Follow the display frame rate, within the 10-30 Hz the bars need
+        return 1.0 / max(10, min(30, render_config.fps))
+
+    def sample(self):
+        if self.reader is None:
+            self.reader = ProcStatReader()
+        return self.reader.read()
+
+    def render(self, data):
+        return create_cpu_display(data)
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+# Audio spectrum visualizer
+AUDIO_RATE = 11025  # Capture rate - plenty for a 9-band display and cheap to FFT
+FFT_SIZE = 256  # ~23 ms window at AUDIO_RATE
+SPECTRUM_FPS = 30  # Minimum frame rate while the spectrum is shown (before eco scaling)
+SPECTRUM_MIN_FREQ = 60.0
+SPECTRUM_FLOOR_DB = -60.0  # Level that maps to an empty bar
+SPECTRUM_DECAY = 1.5  # Bar height lost per second (full scale = 1.0)
+SPECTRUM_PEAK_DECAY = 0.5
+
+class SpectrumAnalyzer:
+    """Windowed FFT -> log-spaced bands with falling bars and peak markers
+
+    Window, bit-reversal order, twiddles and band bin ranges are computed
+    once, so each analyze() is just the FFT butterflies and a few sums.
+    """
+
+    def __init__(self, rate=AUDIO_RATE, size=FFT_SIZE, bands=TIME_WIDTH):
+        self.rate = rate
+        self.size = size
+        self.window = [0.5 - 0.5 * math.cos(2 * math.pi * i / (size - 1)) for i in range(size)]
+        bits = size.bit_length() - 1
+        self.bitrev = [int(f"{i:0{bits}b}"[::-1], 2) for i in range(size)]
+        self.twiddles = [(math.cos(-2 * math.pi * k / size), math.sin(-2 * math.pi * k / size))
+                         for k in range(size // 2)]
+
+        # Log-spaced band edges between SPECTRUM_MIN_FREQ and Nyquist, in FFT bins
+        nyquist = rate / 2.0
+        edges = [SPECTRUM_MIN_FREQ * (nyquist / SPECTRUM_MIN_FREQ) ** (i / bands) for i in range(bands + 1)]
+        self.band_bins = []
+        for lo, hi in zip(edges, edges[1:]):
+            first = max(1, int(lo * size / rate))
+            last = max(first + 1, int(hi * size / rate))
+            self.band_bins.append((first, min(last, size // 2)))
+        # Full-scale sine through the Hann window peaks at about size/4 in magnitude
+        self.reference_power = (size / 4.0) ** 2
+
+        self.levels = [0.0] * bands
+        self.peaks = [0.0] * bands
+        self.last_time = None
+
+    def fft_power(self, samples):
+        """Power spectrum (first size/2 bins) of `size` samples in -1..1"""
+        n = self.size
+        window = self.window
+        re = [samples[j] * window[j] for j in self.bitrev]
+        im = [0.0] * n
+        half = 1
+        while half < n:
+            step = n // (half * 2)
+            for start in range(0, n, half * 2):
+                for k in range(half):
+                    wr, wi = self.twiddles[k * step]
+                    a = start + k
+                    b = a + half
+                    tr = wr * re[b] - wi * im[b]
+                    ti = wr * im[b] + wi * re[b]
+                    re[b] = re[a] - tr
+                    im[b] = im[a] - ti
+                    re[a] += tr
+                    im[a] += ti
+            half *= 2
+        return [re[k] * re[k] + im[k] * im[k] for k in range(n // 2)]
+
+    def analyze(self, samples, now=None):
+        """Update bar levels (0-1) from the newest window; returns (levels, peaks)"""
+        now = clock.monotonic() if now is None else now
+        dt = 0.0 if self.last_time is None else now - self.last_time
+        self.last_time = now
+
+        power = self.fft_power(samples)
+        for band, (first, last) in enumerate(self.band_bins):
+            band_power = max(power[first:last]) / self.reference_power
+            db = 10 * math.log10(band_power) if band_power > 1e-12 else SPECTRUM_FLOOR_DB
+            level = max(0.0, min(1.0, 1.0 - db / SPECTRUM_FLOOR_DB))
+            # Bars jump up instantly and fall at a fixed rate; peaks fall slower
+            self.levels[band] = max(level, self.levels[band] - SPECTRUM_DECAY * dt)
+            self.peaks[band] = max(self.levels[band], self.peaks[band] - SPECTRUM_PEAK_DECAY * dt)
+        return list(self.levels), list(self.peaks)
+
+class PulseMonitorSource:
+    """Capture what's playing from the PipeWire/PulseAudio monitor via parec"""
+
+    live = True
+
+    def __init__(self, device='@DEFAULT_MONITOR@', rate=AUDIO_RATE, latency_ms=20):
+        self.device = device
+        self.rate = rate
+        self.latency = latency_ms / 1000.0
+        self.process = None
+
+    def open(self):
+        import subprocess
+
+        self.process = subprocess.Popen(
+            ['parec', f'--device={self.device}', '--format=s16le', f'--rate={self.rate}',
+             '--channels=1', '--raw', f'--latency-msec={int(self.latency * 1000)}'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        os.set_blocking(self.process.stdout.fileno(), False)
+
+    def fileno(self):
+        return self.process.stdout
+
+    def read(self, size=8192):
+        """Captured bytes, None if nothing is waiting yet, b'' once parec has exited"""
+        try:
+            return os.read(self.process.stdout.fileno(), size)
+        except BlockingIOError:
+            return None
+
+    def close(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process = None
+
+interactive_menu = False  # True once show_main_menu() owns stdin
+
+class FileAudioSource:
+    """16-bit PCM from a WAV file or raw s16le mono file (paced in real time), or stdin ('-')
+
+    Stdin is a live source like parec: it sits in the scheduler's select and
+    is read without blocking as the producer writes it, so it never holds up
+    the other providers. It is refused unless stdin is a pipe or socket, and
+    while the interactive menu is reading it.
+    """
+
+    live = False
+    latency = 0.0
+
+    def __init__(self, path, rate=AUDIO_RATE):
+        self.path = path
+        self.rate = rate
+        self.channels = 1
+        self.wav = None
+        self.stream = None
+        self.fd = None  # Non-blocking stdin
+        self.carry = b''  # Odd byte left over from a short stdin read
+
+    def open(self):
+        import wave
+
+        if self.path == '-':
+            import stat
+
+            mode = os.fstat(sys.stdin.fileno()).st_mode if sys.stdin is not None else 0
+            if not (stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)) or interactive_menu:
+                # A terminal or the menu's stdin would fight input(); plain files can't be select()ed
+                raise ValueError("audio_source '-' needs audio piped to stdin and no interactive menu")
+            self.fd = sys.stdin.fileno()
+            os.set_blocking(self.fd, False)
+            self.live = True
+        elif self.path.lower().endswith('.wav'):
+            self.wav = wave.open(self.path, 'rb')
+            if self.wav.getsampwidth() != 2:
+                raise ValueError("Only 16-bit WAV files are supported")
+            self.rate = self.wav.getframerate()
+            self.channels = self.wav.getnchannels()
+        else:
+            self.stream = open(self.path, 'rb')
+
+    def fileno(self):
+        return self.fd
+
+    def read(self, frames=4096):
+        """Up to `frames` mono frames as s16le bytes (empty at end of input)
+
+        Stdin gives whatever is waiting: None if nothing is, b'' at end of input.
+        """
+        if self.wav is not None:
+            return self.wav.readframes(frames)
+        if self.fd is not None:
+            try:
+                data = os.read(self.fd, frames * 2 * self.channels)
+            except BlockingIOError:
+                return None
+            if not data:
+                return b''
+            data = self.carry + data
+            self.carry = data[len(data) - len(data) % 2:]
+            return data[:len(data) - len(self.carry)] or None
+        return self.stream.read(frames * 2 * self.channels)
+
+    def close(self):
+        if self.wav is not None:
+            self.wav.close()
+        elif self.stream is not None:
+            self.stream.close()
+        if self.fd is not None:
+            os.set_blocking(self.fd, True)
+        self.wav = self.stream = self.fd = None
+        self.carry = b''
+
+def open_audio_source(spec):
+    """'monitor' for the default sink monitor, otherwise a WAV/raw path or '-' for stdin"""
+    if spec in (None, '', 'monitor'):
+        return PulseMonitorSource()
+    return FileAudioSource(spec)
+
+def create_spectrum_display(levels, peaks):
+    """One full-height bar per column with a dimmer peak marker above it"""
+    columns = []
+    for col in range(TIME_WIDTH):
+        column = [0] * TIME_HEIGHT
+        full_rows, partial_fraction = gauge_fill(levels[col], TIME_HEIGHT)
+        for row in range(TIME_HEIGHT - full_rows, TIME_HEIGHT):
+            column[row] = MAX_BRIGHT
+        if full_rows < TIME_HEIGHT:
+            column[TIME_HEIGHT - 1 - full_rows] = int(round(MAX_BRIGHT * partial_fraction))
+        peak_row = TIME_HEIGHT - 1 - min(TIME_HEIGHT - 1, int(peaks[col] * TIME_HEIGHT))
+        if peak_row < TIME_HEIGHT - full_rows - 1:
+            column[peak_row] = MAX_BRIGHT // 2
+        columns.append(column)
+    return columns
+
+class SpectrumProvider(DataProvider):
+    """Audio capture + FFT on the scheduler thread; latest = (levels, peaks)
+
+    Live capture is event-driven (the parec pipe is in the scheduler's
+    select); file/stdin input is read one hop per tick to play in real time.
+    """
+
+    name = 'spectrum'
+
+    def __init__(self):
+        super().__init__()
+        self.source = None
+        self.analyzer = None
+        self.samples_ring = None
+        self.pending = 0  # New samples since the last analysis
+        self.hop = 1
+        self.capture_latency = 0.0
+        self.captured_at = None  # When the newest analysed samples arrived
+        self.latency_ms = None  # Smoothed capture -> LED latency
+
+    @property
+    def enabled(self):
+        return render_config.music_visualizer == 'spectrum'
+
+    @property
+    def interval(self):
+        if not self.enabled or self.source is None:
+            return PROVIDER_IDLE_INTERVAL  # Nothing to read - don't tick at frame rate
+        if self.source.live:
+            return None
+        return self.hop / float(self.analyzer.rate) if self.analyzer else 1.0 / (SPECTRUM_FPS * 2)
+
+    def open(self):
+        import collections
+
+        source = open_audio_source(settings.get('audio_source', 'monitor'))
+        try:
+            source.open()
+        except (OSError, ValueError) as e:
+            self.last_error = e
+            return
+        self.source = source
+        self.capture_latency = source.latency
+        self.analyzer = SpectrumAnalyzer(rate=source.rate)
+        self.samples_ring = collections.deque([0.0] * FFT_SIZE, maxlen=FFT_SIZE)
+        # Analyse at twice the display rate so a fresh spectrum is always waiting
+        self.hop = max(1, source.rate // (SPECTRUM_FPS * 2))
+
+    def fileno(self):
+        if self.source is not None and self.source.live:
+            return self.source.fileno()
+        return None
+
+    def _push(self, data):
+        import array
+
+        pcm = array.array('h')
+        pcm.frombytes(data[:len(data) - len(data) % 2])
+        if sys.byteorder == 'big':
+            pcm.byteswap()
+        channels = getattr(self.source, 'channels', 1)
+        if channels > 1:
+            pcm = [sum(pcm[i:i + channels]) / channels for i in range(0, len(pcm) - channels + 1, channels)]
+        self.samples_ring.extend(v / 32768.0 for v in pcm)
+        self.pending += len(pcm)
+
+    def _analyze(self):
+        self.pending = 0
+        self.captured_at = clock.monotonic()
+        self.latest = self.analyzer.analyze(self.samples_ring, self.captured_at)
+        self.updated_at = self.captured_at
+        self.samples += 1
+
+    def handle_event(self):
+        data = self.source.read()
+        if data is None:
+            return True
+        if not data:
+            # parec exited (no sound server, bad device) or stdin closed - stop watching it
+            self.last_error = EOFError("audio capture ended")
+            log('warning', "Spectrum capture ended (input closed)", key='parec-exit')
+            return False
+        self._push(data)
+        if self.pending >= self.hop:
+            self._analyze()
+
+    def sample(self):
+        if self.source is None:
+            return None
+        data = self.source.read(self.hop)
+        if data:
+            self._push(data)
+            self._analyze()
+        return self.latest
+
+    def refresh(self):
+        if self.source is None or self.source.live:
+            return self.latest
+        return super().refresh()
+
+    def frame_shown(self, now=None):
+        """Record when a frame built from the newest analysis reached the module"""
+        if self.captured_at is None:
+            return
+        now = clock.monotonic() if now is None else now
+        # Samples are on average half a window old at analysis time, plus the capture buffer
+        latency = (now - self.captured_at + FFT_SIZE / 2.0 / self.analyzer.rate + self.capture_latency) * 1000
+        self.latency_ms = latency if self.latency_ms is None else self.latency_ms * 0.9 + latency * 0.1
+
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+# Desktop notifications ticker
+NOTIFY_QUEUE_SIZE = 8  # Pending notifications kept; lowest priority dropped beyond this
+NOTIFY_RATE = 6.0  # Non-critical notifications admitted per minute...
+NOTIFY_BURST = 3  # ...after an initial burst of this many
+NOTIFY_MAX_CHARS = 48  # Longer summaries are cut (they'd scroll for ages)
+NOTIFY_SCROLL_SPEED = 30.0  # Rows per second, independent of fps/eco mode
+NOTIFY_MAX_BUFFER = 65536  # Unparsed dbus-monitor output kept before giving up on a message
+
+class NotificationQueue:
+    """Bounded priority queue of pending notifications with flood control
+
+    Higher urgency first, then arrival order. A notification from an app
+    that already has one waiting replaces it (so "5 new messages" floods
+    collapse into one entry), a token bucket limits how many non-critical
+    notifications get in, and when full the lowest-priority entry is dropped.
+    """
+
+    def __init__(self, max_size=NOTIFY_QUEUE_SIZE, rate=NOTIFY_RATE, burst=NOTIFY_BURST):
+        self.max_size = max_size
+        self.rate = rate / 60.0
+        self.burst = burst
+        self.tokens = float(burst)
+        self.refilled_at = None
+        self.heap = []  # (-urgency, seq, app, text, count)
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.coalesced = 0
+
+    def push(self, app, text, urgency=1, now=None):
+        """Queue a notification; returns False if it was rate limited or dropped"""
+        import heapq
+
+        now = clock.monotonic() if now is None else now
+        with self.lock:
+            for i, (neg_urgency, seq, queued_app, _, count) in enumerate(self.heap):
+                if queued_app == app:
+                    # Same app still waiting: show only its newest text, keep its place
+                    self.heap[i] = (min(neg_urgency, -urgency), seq, app, text, count + 1)
+                    heapq.heapify(self.heap)
+                    self.coalesced += 1
+                    return True
+            if urgency < 2:
+                if self.refilled_at is not None:
+                    self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+                self.refilled_at = now
+                if self.tokens < 1.0:
+                    self.dropped += 1
+                    return False
+                self.tokens -= 1.0
+            self.seq += 1
+            heapq.heappush(self.heap, (-urgency, self.seq, app, text, 1))
+            if len(self.heap) > self.max_size:
+                self.heap.remove(max(self.heap))  # Least urgent, newest
+                heapq.heapify(self.heap)
+                self.dropped += 1
+            return True
+
+    def pop(self):
+        """Most important pending notification as (app, text, urgency, count), or None"""
+        import heapq
+
+        with self.lock:
+            if not self.heap:
+                return None
+            neg_urgency, _, app, text, count = heapq.heappop(self.heap)
+            return app, text, -neg_urgency, count
+
+    def __len__(self):
+        return len(self.heap)
+
+class NotificationProvider(DataProvider):
+    """Eavesdrop org.freedesktop.Notifications.Notify on the session bus
+
+    One long-lived dbus-monitor; its output is parsed incrementally on the
+    scheduler thread and only whole notifications reach the queue. The render
+    loop calls ticker() once per frame, which is just a clock comparison.
+    """
+
+    name = 'notifications'
+    interval = None
+    throttle = False
+
+    def __init__(self):
+        super().__init__()
+        self.process = None
+        self.buffer = b''
+        self.queue = NotificationQueue()
+        self.args = None  # Top-level arguments of the Notify call being parsed
+        self.pending_string = None  # Multi-line string argument
+        self.urgency = 1
+        self.expect_urgency = False
+        self.current = None  # (text, started_at, duration)
+
+    @property
+    def enabled(self):
+        return render_config.notifications_enabled
+
+    def open(self):
+        import subprocess
+        import shutil
+
+        if not shutil.which('dbus-monitor'):
+            return
+        match = "type='method_call',interface='org.freedesktop.Notifications',member='Notify'"
+        try:
+            self.process = subprocess.Popen(['dbus-monitor', '--session', match],
+                                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            self.last_error = e
+            return
+        os.set_blocking(self.process.stdout.fileno(), False)
+
+    def fileno(self):
+        return self.process.stdout if self.process is not None else None
+
+    def handle_event(self):
+        try:
+            data = os.read(self.process.stdout.fileno(), 4096)
+        except BlockingIOError:
+            return True
+        if not data:
+            return False  # dbus-monitor exited
+        self.buffer += data
+        if len(self.buffer) > NOTIFY_MAX_BUFFER:
+            self.buffer = b''  # Runaway message; resync on the next header
+            self.args = None
+        while b'\n' in self.buffer:
+            line, self.buffer = self.buffer.split(b'\n', 1)
+            self.parse_line(line.decode('utf-8', 'replace'))
+        return True
+
+    def parse_line(self, line):
+        if line.startswith('method call') and 'member=Notify' in line:
+            self.args = []
+            self.pending_string = None
+            self.urgency = 1
+            self.expect_urgency = False
+            return
+        if self.args is None:
+            return
+        if self.pending_string is not None:
+            if line.endswith('"'):
+                self.args.append(self.pending_string + ' ' + line[:-1])
+                self.pending_string = None
+            else:
+                self.pending_string += ' ' + line
+            return
+        if self.expect_urgency and 'byte' in line:
+            self.expect_urgency = False
+            try:
+                self.urgency = int(line.split()[-1])
+            except ValueError:
+                pass
+        elif 'string "urgency"' in line:
+            self.expect_urgency = True
+        # Top-level arguments are indented by exactly three spaces
+        if not line.startswith('   ') or line.startswith('    '):
+            return
+        kind, _, value = line[3:].partition(' ')
+        if kind == 'string':
+            if value.endswith('"') and len(value) > 1:
+                self.args.append(value[1:-1])
+            else:
+                self.pending_string = value[1:]
+        elif kind == 'int32' and len(self.args) >= 7:
+            # expire_timeout, after (app, replaces_id, icon, summary, body, actions, hints)
+            app, summary, body = self.args[0], self.args[3], self.args[4]
+            text = ' '.join((summary or body).split())[:NOTIFY_MAX_CHARS]
+            if text:
+                self.queue.push(app, text, self.urgency)
+                self.latest = text
+                self.updated_at = clock.monotonic()
+                self.samples += 1
+            self.args = None
+        elif kind and kind != ']':
+            self.args.append(value)
+
+    def ticker(self, now=None):
+        """(text, scroll offset) to show this frame, or None when there's nothing to show"""
+        now = clock.monotonic() if now is None else now
+        if self.current is not None and now - self.current[1] >= self.current[2]:
+            self.current = None
+        if self.current is None:
+            entry = self.queue.pop()
+            if entry is None:
+                return None
+            app, text, urgency, count = entry
+            if count > 1:
+                text = f"{text} +{count - 1}"
+            rows = len(text_glyphs(text)) * 6
+            self.current = (text, now, (rows + TIME_HEIGHT) / NOTIFY_SCROLL_SPEED)
+        text, started_at, _ = self.current
+        return text, int((now - started_at) * NOTIFY_SCROLL_SPEED) - TIME_HEIGHT
+
+    def close(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+        self.buffer = b''
+        self.args = None
+        self.current = None
+
+def suspend_clock_offset():
+    """Total time the system has spent suspended since boot
+
+    CLOCK_BOOTTIME keeps counting across suspend and CLOCK_MONOTONIC doesn't,
+    so a jump in the difference means we just resumed (works without logind).
+    """
+    try:
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - time.monotonic()
+    except (AttributeError, OSError):
+        return 0.0
+
+class SleepProvider(DataProvider):
+    """logind PrepareForSleep via dbus-monitor; latest = True while going to / in suspend"""
+
+    name = 'sleep'
+    interval = None
+    throttle = False
+
+    def __init__(self):
+        super().__init__()
+        self.process = None
+        self.buffer = b''
+        self.expect_value = False
+        self.resumed = threading.Event()
+        self.resumed.set()
+        self.latest = False
+
+    def open(self):
+        import subprocess
+        import shutil
+
+        if not shutil.which('dbus-monitor'):
+            return
+        match = ("type='signal',sender='org.freedesktop.login1',"
+                 "interface='org.freedesktop.login1.Manager',member='PrepareForSleep'")
+        try:
+            self.process = subprocess.Popen(['dbus-monitor', '--system', match],
+                                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            self.last_error = e
+            return
+        os.set_blocking(self.process.stdout.fileno(), False)
+
+    def fileno(self):
+        return self.process.stdout if self.process is not None else None
+
+    def handle_event(self):
+        try:
+            data = os.read(self.process.stdout.fileno(), 4096)
+        except BlockingIOError:
+            return True
+        if not data:
+            # dbus-monitor exited (e.g. system bus restart) - don't stay dark waiting for a resume signal
+            self.set_sleeping(False)
+            return False
+        self.buffer += data
+        while b'\n' in self.buffer:
+            line, self.buffer = self.buffer.split(b'\n', 1)
+            if b'member=PrepareForSleep' in line:
+                self.expect_value = True
+            elif self.expect_value and b'boolean' in line:
+                self.expect_value = False
+                self.set_sleeping(b'true' in line)
+        return True
+
+    def set_sleeping(self, sleeping):
+        self.latest = sleeping
+        self.updated_at = clock.monotonic()
+        self.samples += 1
+        if sleeping:
+            self.resumed.clear()
+        else:
+            self.resumed.set()
+
+    def wait_for_resume(self, timeout):
+        return self.resumed.wait(timeout)
+
+    def close(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+        self.buffer = b''
+        self.set_sleeping(False)
+
+# Album art: cover thumbnails dithered down to one module
+ART_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                             'led-battery-monitor', 'art')
+ART_CACHE_VERSION = 1  # Bump when the thumbnail processing changes
+ART_MEMORY_ENTRIES = 32
+ART_RETRY_INTERVAL = 10.0  # Seconds before a cover that failed to decode is tried again
+ART_LEVELS = 8  # Brightness steps the dither quantises to
+ART_GAMMA = 2.2  # Cover art is sRGB; LED PWM is linear
+
+def parse_pnm(data):
+    """(width, height, gray bytes) from a binary PGM (P5) or PPM (P6) image"""
+    fields = []
+    pos = 0
+    while len(fields) < 4:
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b'#':
+            pos = data.index(b'\n', pos) + 1
+            continue
+        end = pos
+        while end < len(data) and not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    magic, width, height, maxval = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    if magic not in (b'P5', b'P6') or maxval > 255:
+        raise ValueError("only 8-bit binary PGM/PPM is supported")
+    pixels = data[pos + 1:]
+    if magic == b'P6':
+        rgb = pixels[:width * height * 3]
+        # Rec. 601 luma, integer maths
+        pixels = bytes((77 * rgb[i] + 150 * rgb[i + 1] + 29 * rgb[i + 2]) >> 8 for i in range(0, len(rgb), 3))
+    if len(pixels) < width * height:
+        raise ValueError("truncated image")
+    return width, height, pixels[:width * height]
+
+def load_image_gray(path):
+    """Decode any image to (width, height, gray bytes)
+
+    PGM/PPM are read directly; anything else (usually JPEG or PNG) goes
+    through Pillow if it's installed, otherwise ffmpeg or ImageMagick.
+    """
+    import shutil
+    import subprocess
+
+    with open(path, 'rb') as f:
+        head = f.read(2)
+        if head in (b'P5', b'P6'):
+            return parse_pnm(head + f.read())
+    try:
+        from PIL import Image
+    except ImportError:
+        pass
+    else:
+        with Image.open(path) as image:
+            image = image.convert('L')
+            return image.width, image.height, image.tobytes()
+    for command in (['ffmpeg', '-v', 'error', '-i', path, '-frames:v', '1', '-c:v', 'pgm', '-f', 'image2pipe', '-'],
+                    ['magick', path, 'pgm:-'], ['convert', path, 'pgm:-']):
+        if shutil.which(command[0]):
+            result = subprocess.run(command, capture_output=True, timeout=10)
+            if result.returncode == 0 and result.stdout:
+                return parse_pnm(result.stdout)
+    raise ValueError(f"no decoder for {path} (install Pillow, ffmpeg or ImageMagick)")
+
+def downsample_cover(width, height, pixels, out_width=WIDTH, out_height=HEIGHT):
+    """Box-filter the centre of an image to out_width x out_height; returns [row][col] floats 0-1 (linear light)
+
+    The image is cropped to the module's aspect ratio first, so a square
+    cover shows its middle strip rather than being squashed.
+    """
+    if width * out_height > height * out_width:
+        crop_width, crop_height = max(1, height * out_width // out_height), height
+    else:
+        crop_width, crop_height = width, max(1, width * out_height // out_width)
+    left, top = (width - crop_width) // 2, (height - crop_height) // 2
+    to_linear = [(value / 255.0) ** ART_GAMMA for value in range(256)]
+    rows = []
+    for out_row in range(out_height):
+        y0 = top + out_row * crop_height // out_height
+        y1 = max(y0 + 1, top + (out_row + 1) * crop_height // out_height)
+        row = []
+        for out_col in range(out_width):
+            x0 = left + out_col * crop_width // out_width
+            x1 = max(x0 + 1, left + (out_col + 1) * crop_width // out_width)
+            total = 0.0
+            for y in range(y0, y1):
+                offset = y * width
+                total += sum(to_linear[value] for value in pixels[offset + x0:offset + x1])
+            row.append(total / ((y1 - y0) * (x1 - x0)))
+        rows.append(row)
+    return rows
+
+def dither_levels(rows, levels=ART_LEVELS):
+    """Floyd-Steinberg error diffusion of 0-1 values to `levels` steps; returns [row][col] brightness"""
+    height, width = len(rows), len(rows[0])
+    work = [list(row) for row in rows]
+    out = [[0] * width for _ in range(height)]
+    steps = levels - 1
+    for y in range(height):
+        for x in range(width):
+            old = max(0.0, min(1.0, work[y][x]))
+            level = int(round(old * steps))
+            out[y][x] = int(round(level * MAX_BRIGHT / steps))
+            error = old - level / steps
+            if x + 1 < width:
+                work[y][x + 1] += error * 7 / 16
+            if y + 1 < height:
+                if x > 0:
+                    work[y + 1][x - 1] += error * 3 / 16
+                work[y + 1][x] += error * 5 / 16
+                if x + 1 < width:
+                    work[y + 1][x + 1] += error * 1 / 16
+    return out
+
+def art_url_path(url):
+    """Local path for a file:// art URL (or a bare path), else None"""
+    from urllib.parse import urlparse, unquote
+
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        return unquote(parsed.path)
+    if parsed.scheme == '' and url.startswith('/'):
+        return url
+    return None
+
+class AlbumArtCache:
+    """Dithered WIDTH x HEIGHT thumbnails of local covers, in memory and on disk
+
+    Each cover is decoded and dithered once; afterwards it's a dict hit, or a
+    306-byte read after a restart. Only local (file://) art is supported. The
+    key includes the file's mtime and size, so a player that rewrites one
+    cover path for every track gets the new cover. A cover that fails to
+    decode (e.g. announced before it was written) is retried after
+    ART_RETRY_INTERVAL instead of being remembered as missing.
+    """
+
+    def __init__(self, directory=ART_CACHE_DIR, entries=ART_MEMORY_ENTRIES):
+        self.directory = directory
+        self.entries = entries
+        self.memory = collections.OrderedDict()  # (url, mtime_ns, size) -> columns
+        self.failed = {}  # (url, mtime_ns, size) -> clock.monotonic() of the failed decode
+        self.decodes = 0
+
+    def _disk_path(self, key):
+        import hashlib
+
+        digest = hashlib.sha1(f"{ART_CACHE_VERSION}:{key!r}".encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.art")
+
+    def get(self, url):
+        """[col][row] columns for this cover, or None if it can't be shown (yet)"""
+        path = art_url_path(url)
+        if path is None:
+            log('info', f"Album art not local, skipping: {url}", key='art-remote')
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None  # Not written yet - try again next time
+        key = (url, st.st_mtime_ns, st.st_size)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        failed_at = self.failed.get(key)
+        if failed_at is not None and clock.monotonic() - failed_at < ART_RETRY_INTERVAL:
+            return None
+        columns = self._load(key, path)
+        if columns is None:
+            self.failed[key] = clock.monotonic()
+            if len(self.failed) > self.entries:
+                self.failed.pop(next(iter(self.failed)))
+            return None
+        self.failed.pop(key, None)
+        self.memory[key] = columns
+        if len(self.memory) > self.entries:
+            self.memory.popitem(last=False)
+        return columns
+
+    def _load(self, key, path):
+        disk_path = self._disk_path(key)
+        try:
+            with open(disk_path, 'rb') as f:
+                data = f.read()
+            if len(data) == WIDTH * HEIGHT:
+                return [list(data[col * HEIGHT:(col + 1) * HEIGHT]) for col in range(WIDTH)]
+        except OSError:
+            pass
+
+        try:
+            columns = matrix_to_columns(dither_levels(downsample_cover(*load_image_gray(path))))
+        except (OSError, ValueError, IndexError) as e:
+            log('warning', f"Could not decode album art {path}: {e}", key=('art', key[0]))
+            return None
+        self.decodes += 1
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(bytes(value for column in columns for value in column))
+            os.replace(tmp_path, disk_path)
+        except OSError as e:
+            log('warning', f"Could not cache album art: {e}", key='art-cache')
+        return columns
+
+album_art_cache = AlbumArtCache()
+
+class ArtProvider(DataProvider):
+    """Thumbnail for the playing track's cover; latest = (art url, columns or None)
+
+    Decoding happens here on the scheduler thread, never in the render loop.
+    """
+
+    name = 'art'
+    interval = 1.0
+
+    @property
+    def enabled(self):
+        return render_config.music_visualizer == 'art'
+
+    def sample(self):
+        music_info = spotify_provider.latest
+        url = music_info.get('art_url') if music_info else None
+        if not url:
+            return None
+        return url, album_art_cache.get(url)
+
+# Eco mode: keep the monitor's own cost down while on battery
+# (fps scale, pulse animation allowed, sensor interval scale), from full quality down
+ECO_LEVELS = [
+    (1.0, True, 1.0),
+    (0.5, True, 2.0),
+    (0.3, False, 4.0),
+    (0.1, False, 8.0),
+]
+
+class EcoProvider(DataProvider):
+    """Measure our own CPU time and serial traffic and pick an ECO_LEVELS entry
+
+    While discharging with eco mode on, steps one level down when CPU use
+    (this process plus reaped helpers like dbus-send/upower) is over budget
+    and back up when comfortably under it; on AC it is always full quality.
+    Sensor cadence is applied through provider_scheduler.interval_scale,
+    fps and pulse are read by the render loop from `latest`.
+    """
+
+    name = 'eco'
+    interval = 5.0  # Long enough window for a stable CPU figure
+    throttle = False
+
+    def __init__(self):
+        super().__init__()
+        self.level = 0
+        self.process = None
+        self.prev = None  # (wall, cpu seconds, serial bytes)
+        self.cpu_percent = None
+        self.serial_rate = None
+        self.latest = ECO_LEVELS[0]
+
+    def sample(self):
+        if self.process is None:
+            self.process = psutil.Process()
+        times = self.process.cpu_times()
+        cpu = times.user + times.system + getattr(times, 'children_user', 0.0) + getattr(times, 'children_system', 0.0)
+        sent = sum(device.compositor.bytes_sent for device in device_pool.devices)
+        now = clock.monotonic()
+        if self.prev is not None and now > self.prev[0]:
+            elapsed = now - self.prev[0]
+            self.cpu_percent = (cpu - self.prev[1]) / elapsed * 100.0
+            self.serial_rate = (sent - self.prev[2]) / elapsed
+        self.prev = (now, cpu, sent)
+
+        config = render_config
+        battery = battery_provider.latest
+        discharging = battery is not None and battery[0] is not None and battery[1] <= 0 and battery[2] > 0
+        if not (config.eco_mode and discharging):
+            self.level = 0
+        elif self.cpu_percent is not None:
+            if self.cpu_percent > config.eco_cpu_budget:
+                self.level = min(self.level + 1, len(ECO_LEVELS) - 1)
+            elif self.cpu_percent < config.eco_cpu_budget * 0.5:
+                self.level = max(self.level - 1, 0)
+        provider_scheduler.interval_scale = ECO_LEVELS[self.level][2]
+        return ECO_LEVELS[self.level]
+
+    def close(self):
+        self.level = 0
+        self.prev = None
+        self.latest = ECO_LEVELS[0]
+        provider_scheduler.interval_scale = 1.0
+
+class LogFlushProvider(DataProvider):
+    """Write the log ring out every few seconds, on the scheduler thread"""
+
+    name = 'log'
+    interval = LOG_FLUSH_INTERVAL
+
+    def sample(self):
+        return log_ring.flush(settings['log_target'])
+
+    def close(self):
+        try:
+            log_ring.flush(settings['log_target'])
+        except OSError:
+            pass
+
+provider_scheduler = ProviderScheduler()
+battery_provider = provider_scheduler.add(BatteryProvider())
+spotify_provider = provider_scheduler.add(SpotifyProvider())
+cpu_provider = provider_scheduler.add(CpuProvider())
+spectrum_provider = provider_scheduler.add(SpectrumProvider())
+eco_provider = provider_scheduler.add(EcoProvider())
+sleep_provider = provider_scheduler.add(SleepProvider())
+notification_provider = provider_scheduler.add(NotificationProvider())
+art_provider = provider_scheduler.add(ArtProvider())
+log_flush_provider = provider_scheduler.add(LogFlushProvider())
+
+# Frame encoding (shared by the live display, recorder and replayer)
+IDENTITY_LUT = bytes(range(256))
+
+# (byte, bit mask) for every pixel in the firmware's bitmap order: index = x + WIDTH * y
+BW_BIT_POSITIONS = [[((x + WIDTH * y) // 8, 1 << ((x + WIDTH * y) % 8)) for y in range(HEIGHT)]
+                    for x in range(WIDTH)]
+
+def pack_bw_frame(columns):
+    """Pack already-binary columns (0/255 bytes) into the 39-byte bitmap"""
+    bitmap = bytearray(BW_FRAME_BYTES)
+    for x, column in enumerate(columns):
+        positions = BW_BIT_POSITIONS[x]
+        for y, value in enumerate(column):
+            if value:
+                index, mask = positions[y]
+                bitmap[index] |= mask
+    return bitmap
+
+def scale_frame(columns, lut=IDENTITY_LUT):
+    """Columns of pixel values -> list of per-column bytes after brightness scaling"""
+    scaled = []
+    for values in columns:
+        try:
+            payload = bytes(values)
+        except ValueError:
+            payload = bytes(max(0, min(255, int(v))) for v in values)
+        scaled.append(payload.translate(lut))
+    return scaled
+
+def encode_frame(scaled):
+    """Wire bytes for a scaled frame, as a packed bitmap when it is pure on/off
+
+    Time digits, scrolling text and clears end up as 0/255 after brightness
+    scaling at full brightness, so they go out as one 42 byte command instead
+    of nine 38 byte column stages plus a flush. Anything with grey levels
+    (dimmed output, fades, pulse) takes the column path.
+    """
+    if len(scaled) == WIDTH and all(len(c) == HEIGHT and not c.translate(None, b'\x00\xff') for c in scaled):
+        return bytes((0x32, 0xAC, CMD_DRAW_BW)) + pack_bw_frame(scaled)
+    data = bytearray()
+    for col, payload in enumerate(scaled):
+        data += bytes((0x32, 0xAC, CMD_STAGE_COL, col))
+        data += payload
+    data += bytes((0x32, 0xAC, CMD_FLUSH_COLS))
+    return bytes(data)
+
+# Frame recording / replay
+RECORDING_MAGIC = b'LEDFRAME'
+RECORDING_VERSION = 1
+RECORDING_HEADER = struct.Struct('<8sHBBI')  # magic, version, width, height, reserved
+RECORD_HEADER = struct.Struct('<dB3x')  # wall-clock timestamp, device id
+RECORD_SIZE = RECORD_HEADER.size + WIDTH * HEIGHT
+
+class FrameRecorder:
+    """Append every committed frame to a compact binary file
+
+    Fixed-size records (timestamp, device, 9x34 scaled pixel bytes in column
+    order) so the replayer can index straight into a memory map.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            with open(path, 'rb') as f:
+                magic, version, width, height, _ = RECORDING_HEADER.unpack(f.read(RECORDING_HEADER.size))
+            if magic != RECORDING_MAGIC or (width, height) != (WIDTH, HEIGHT):
+                raise ValueError(f"{path} is not a {WIDTH}x{HEIGHT} frame recording")
+        self.file = open(path, 'ab')
+        if new_file:
+            self.file.write(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, WIDTH, HEIGHT, 0))
+        self.lock = threading.Lock()
+        self.frames = 0
+
+    def record(self, device_id, scaled, timestamp=None):
+        header = RECORD_HEADER.pack(clock.time() if timestamp is None else timestamp, device_id)
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(header + b''.join(scaled))
+            self.frames += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+class FrameReplayer:
+    """Memory-map a recording and stream its frames to real or emulated modules"""
+
+    def __init__(self, path):
+        import mmap
+
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, width, height, _ = RECORDING_HEADER.unpack_from(self.map, 0)
+        if magic != RECORDING_MAGIC or version != RECORDING_VERSION or (width, height) != (WIDTH, HEIGHT):
+            raise ValueError(f"{path} is not a {WIDTH}x{HEIGHT} frame recording")
+        self.view = memoryview(self.map)
+        # A torn final record (recorder killed mid-write) is ignored
+        self.count = (len(self.map) - RECORDING_HEADER.size) // RECORD_SIZE
+
+    def __len__(self):
+        return self.count
+
+    def frame(self, index):
+        """(timestamp, device id, list of per-column pixel views) - no copying"""
+        offset = RECORDING_HEADER.size + index * RECORD_SIZE
+        timestamp, device_id = RECORD_HEADER.unpack_from(self.map, offset)
+        pixels = offset + RECORD_HEADER.size
+        columns = [self.view[pixels + col * HEIGHT:pixels + (col + 1) * HEIGHT] for col in range(WIDTH)]
+        return timestamp, device_id, columns
+
+    def replay(self, devices, speed=1.0):
+        """Send every frame to devices[device_id]; speed=None replays as fast as possible
+
+        Returns throughput stats for benchmarking.
+        """
+        start = time.monotonic()
+        first_timestamp = None
+        frames = 0
+        written = 0
+        for index in range(self.count):
+            timestamp, device_id, columns = self.frame(index)
+            device = devices.get(device_id)
+            if device is None:
+                continue
+            if speed:
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                delay = (timestamp - first_timestamp) / speed - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            data = encode_frame([bytes(c) for c in columns])
+            del columns
+            device.write(data)
+            frames += 1
+            written += len(data)
+        elapsed = time.monotonic() - start
+        return {
+            'frames': frames,
+            'bytes': written,
+            'seconds': elapsed,
+            'fps': frames / elapsed if elapsed > 0 else None,
+        }
+
+    def close(self):
+        self.view.release()
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # a caller still holds frame views; the mapping goes away with them
+        self.file.close()
+
+class EmulatedModule:
+    """Stand-in for a serial LED module: accepts writes and counts them"""
+
+    def __init__(self, name='emulated'):
+        self.port = name
+        self.bytes_written = 0
+        self.writes = 0
+        self.last_write = b''
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        self.writes += 1
+        self.last_write = bytes(data)
+        return len(data)
+
+    def close(self):
+        pass
+
+frame_recorder = None  # FrameRecorder while --record is active
+recording_device_ids = {}  # serial port -> device id in recordings (0 = left, 1 = right)
+
+# Shared-memory state snapshot (for status bars and other local readers)
+STATE_FILE = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(),
+                          f"led-battery-monitor-{os.getuid()}.state")
+STATE_MAGIC = b'LEDSTATE'
+STATE_VERSION = 1
+STATE_HEADER = struct.Struct('<8sHHII')  # magic, version, reserved, sequence, payload length
+STATE_SIZE = 4096
+STATE_STAMP_ROOM = 32  # Bytes kept free for the "updated" timestamp
+STATE_HEARTBEAT = 1.0  # Seconds between rewrites of an unchanged snapshot
+STATE_STALE = 5.0  # Readers treat an older snapshot as a dead monitor
+
+class StatePublisher:
+    """Publish monitor_status as JSON in a small mmapped file, seqlock style
+
+    The writer makes the sequence number odd, writes the payload, then makes
+    it even again. Readers keep the file mapped and retry until they see the
+    same even sequence before and after copying, so they never block the
+    monitor and never need a syscall per read. XDG_RUNTIME_DIR is a tmpfs, so
+    this never touches the disk.
+
+    Every snapshot carries the writer's pid and an "updated" wall-clock
+    timestamp, refreshed at least every STATE_HEARTBEAT seconds, so readers
+    can tell a live monitor from one that was killed without cleaning up.
+    """
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self.map = None
+        self.sequence = 0
+        self.last_payload = None
+        self.published_at = 0
+
+    def open(self):
+        import mmap
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            os.ftruncate(fd, STATE_SIZE)
+            self.map = mmap.mmap(fd, STATE_SIZE)
+        finally:
+            os.close(fd)
+        _, _, _, sequence, _ = STATE_HEADER.unpack_from(self.map, 0)
+        self.sequence = sequence + (sequence & 1)  # Keep going up for readers that stayed mapped
+        STATE_HEADER.pack_into(self.map, 0, STATE_MAGIC, STATE_VERSION, 0, self.sequence, 0)
+
+    def publish(self, state, now=None):
+        """Write a new snapshot if it differs from the last one or the heartbeat is due"""
+        if self.map is None:
+            return False
+        # Wall time, not clock: readers in other processes compare it with their own
+        now = time.time() if now is None else now
+        snapshot = dict(state, pid=os.getpid())
+        payload = json.dumps(snapshot, separators=(',', ':'), default=str).encode()
+        if len(payload) > STATE_SIZE - STATE_HEADER.size - STATE_STAMP_ROOM:
+            # Only now-playing text can get this long
+            snapshot['music'] = None
+            payload = json.dumps(snapshot, separators=(',', ':'), default=str).encode()
+        if payload == self.last_payload and now - self.published_at < STATE_HEARTBEAT:
+            return False
+        self.last_payload = payload
+        self.published_at = now
+        payload = json.dumps(dict(snapshot, updated=round(now, 3)), separators=(',', ':'), default=str).encode()
+        self.sequence += 1  # Odd: write in progress
+        STATE_HEADER.pack_into(self.map, 0, STATE_MAGIC, STATE_VERSION, 0, self.sequence, len(payload))
+        self.map[STATE_HEADER.size:STATE_HEADER.size + len(payload)] = payload
+        self.sequence += 1
+        STATE_HEADER.pack_into(self.map, 0, STATE_MAGIC, STATE_VERSION, 0, self.sequence, len(payload))
+        return True
+
+    def close(self):
+        if self.map is None:
+            return
+        self.publish(dict(monitor_status, running=False))
+        self.map.close()
+        self.map = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+class StateReader:
+    """Reader side of StatePublisher; map once, then read() as often as you like
+
+    A snapshot whose writer has exited, or that hasn't been refreshed for
+    STATE_STALE seconds, is reported with running=False.
+    """
+
+    def __init__(self, path=STATE_FILE):
+        import mmap
+
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), STATE_SIZE, access=mmap.ACCESS_READ)
+        self.checked_pid = None  # Writer pid last seen alive, and when (one kill(0) per heartbeat)
+        self.checked_at = 0
+
+    def writer_alive(self, state, now=None):
+        """True if the snapshot is fresh and its writer process still exists"""
+        now = time.time() if now is None else now
+        pid, updated = state.get('pid'), state.get('updated')
+        if not isinstance(pid, int) or not isinstance(updated, (int, float)):
+            return False
+        if abs(now - updated) > STATE_STALE:
+            return False
+        if pid == self.checked_pid and now - self.checked_at < STATE_HEARTBEAT:
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass  # Exists, just not ours
+        self.checked_pid, self.checked_at = pid, now
+        return True
+
+    def read(self, retries=1000):
+        """Latest consistent snapshot as a dict, or None if the writer kept us out"""
+        for attempt in range(retries):
+            magic, version, _, before, length = STATE_HEADER.unpack_from(self.map, 0)
+            if magic != STATE_MAGIC or version != STATE_VERSION:
+                return None
+            if before & 1:
+                continue
+            payload = self.map[STATE_HEADER.size:STATE_HEADER.size + length]
+            if STATE_HEADER.unpack_from(self.map, 0)[3] == before:
+                state = json.loads(payload) if payload else {}
+                if state.get('running') and not self.writer_alive(state):
+                    state['running'] = False
+                return state
+        return None
+
+    def close(self):
+        self.map.close()
+
+state_publisher = StatePublisher()
+
+# Local control socket (for keyboard shortcuts and scripts)
+CONTROL_SOCKET = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(),
+                              f"led-battery-monitor-{os.getuid()}.sock")
+
+# Latest state published by the monitor loop for `status` requests
+monitor_status = {
+    'running': False,
+    'battery': None,
+    'charge_rate': 0,
+    'discharge_rate': 0,
+    'minutes_remaining': None,
+    'music': None,
+    'spectrum_latency_ms': None,
+    'eco_level': 0,
+    'cpu_percent': None,
+    'serial_bytes_per_sec': None,
+    'suspended': False,
+    'stalls': 0,
+    'restarts': 0,
+    'reopens': 0,
+}
+
+def handle_control_command(line):
+    """Run one control command and return a JSON-serialisable reply
+
+    Commands (one per line):
+      status                               current battery/music/brightness state
+      brightness <battery|time|both> <0-255>
+      fps <1-60>
+      dim | undim                          force auto-dim level / wake displays
+      music <on|off|toggle>                switch between music and battery mode
+      log [count]                          recent diagnostics (newest last)
+      ping
+    """
+    global forced_dim
+    parts = line.split()
+    if not parts:
+        return {'ok': False, 'error': 'empty command'}
+    command, args = parts[0].lower(), parts[1:]
+
+    try:
+        if command == 'ping':
+            return {'ok': True, 'reply': 'pong'}
+
+        elif command == 'status':
+            return {
+                'ok': True,
+                'running': monitor_status['running'],
+                'battery': monitor_status['battery'],
+                'charge_rate': monitor_status['charge_rate'],
+                'discharge_rate': monitor_status['discharge_rate'],
+                'minutes_remaining': monitor_status['minutes_remaining'],
+                'time_to_full': battery_estimator.time_to_full(),
+                'music': monitor_status['music'],
+                'spectrum_latency_ms': monitor_status['spectrum_latency_ms'],
+                'dimmed': check_dim_timeout() < 1.0,
+                'battery_brightness': settings['battery_brightness'],
+                'time_brightness': settings['time_brightness'],
+                'fps': settings['fps'],
+                'music_enabled': settings['music_enabled'],
+                'stalls': monitor_status['stalls'],
+                'restarts': monitor_status['restarts'],
+                'reopens': monitor_status['reopens'],
+            }
+
+        elif command == 'brightness' and len(args) == 2:
+            target, value = args[0].lower(), max(0, min(255, int(args[1])))
+            if target not in ('battery', 'time', 'both'):
+                return {'ok': False, 'error': f"unknown display '{target}'"}
+            display_types = ['battery', 'time'] if target == 'both' else [target]
+            for display_type in display_types:
+                settings[f"{display_type}_brightness"] = value
+                apply_brightness_immediately(display_type, cached=True)
+            save_settings()
+            return {'ok': True, 'brightness': value}
+
+        elif command == 'fps' and len(args) == 1:
+            settings['fps'] = max(1, min(60, int(args[0])))
+            save_settings()
+            return {'ok': True, 'fps': settings['fps']}
+
+        elif command == 'dim' and not args:
+            if settings['dim_timeout'] == 0:
+                return {'ok': False, 'error': 'auto-dim is disabled'}
+            if monitor_status['running']:
+                # The monitor loop picks this up on its next frame
+                forced_dim = True
+            else:
+                force_dim_now(cached=True)
+            return {'ok': True}
+
+        elif command == 'undim' and not args:
+            register_activity()
+            if not monitor_status['running']:
+                apply_brightness_immediately("battery", cached=True)
+                apply_brightness_immediately("time", cached=True)
+            return {'ok': True}
+
+        elif command == 'music' and len(args) == 1:
+            mode = args[0].lower()
+            if mode == 'toggle':
+                settings['music_enabled'] = not settings['music_enabled']
+            elif mode in ('on', 'off'):
+                settings['music_enabled'] = mode == 'on'
+            else:
+                return {'ok': False, 'error': f"unknown music mode '{mode}'"}
+            save_settings()
+            return {'ok': True, 'music_enabled': settings['music_enabled']}
+
+        elif command == 'log' and len(args) <= 1:
+            return {'ok': True, 'entries': log_ring.recent(int(args[0]) if args else 20)}
+
+    except ValueError:
+        return {'ok': False, 'error': f"invalid number in '{line.strip()}'"}
+
+    return {'ok': False, 'error': f"unknown command '{line.strip()}'"}
+
+class ControlServer:
+    """Serve handle_control_command() over a Unix socket from one selector thread
+
+    Each newline-terminated command gets a single-line JSON reply on the same
+    connection. Everything happens in-process, so a reply is typically well
+    under a millisecond and nothing has to redraw the menu.
+    """
+
+    MAX_LINE = 1024
+
+    def __init__(self, path=CONTROL_SOCKET):
+        self.path = path
+        self.selector = None
+        self.listener = None
+        self.thread = None
+        self.running = False
+        self.buffers = {}
+
+    def start(self):
+        import selectors
+        import socket
+
+        if os.path.exists(self.path):
+            # Only take over the path if nobody is listening on it
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                probe.close()
+                print(f"Control socket {self.path} is in use by another instance")
+                return False
+            except OSError:
+                probe.close()
+                os.unlink(self.path)
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)  # Owner-only: the socket can change the displays
+        try:
+            self.listener.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        self.listener.listen(8)
+        self.listener.setblocking(False)
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+        return True
+
+    def _serve(self):
+        import selectors
+
+        while self.running:
+            for key, _ in self.selector.select(timeout=0.5):
+                sock = key.fileobj
+                if sock is self.listener:
+                    try:
+                        conn, _ = self.listener.accept()
+                    except OSError:
+                        continue
+                    conn.setblocking(False)
+                    self.buffers[conn] = b''
+                    self.selector.register(conn, selectors.EVENT_READ)
+                else:
+                    self._handle_readable(sock)
+
+    def _close(self, conn):
+        self.selector.unregister(conn)
+        self.buffers.pop(conn, None)
+        conn.close()
+
+    def _handle_readable(self, conn):
+        try:
+            data = conn.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._close(conn)
+            return
+        if not data:
+            self._close(conn)
+            return
+
+        buffer = self.buffers[conn] + data
+        while b'\n' in buffer:
+            raw_line, buffer = buffer.split(b'\n', 1)
+            try:
+                reply = handle_control_command(raw_line.decode('utf-8', 'replace'))
+            except Exception as e:
+                reply = {'ok': False, 'error': str(e)}
+            try:
+                conn.sendall((json.dumps(reply) + '\n').encode())
+            except OSError:
+                self._close(conn)
+                return
+        if len(buffer) > self.MAX_LINE:
+            self._close(conn)
+            return
+        self.buffers[conn] = buffer
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        if self.selector is not None:
+            for key in list(self.selector.get_map().values()):
+                key.fileobj.close()
+            self.selector.close()
+            self.selector = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+control_server = ControlServer()
+
+def send_control_command(command, path=CONTROL_SOCKET, timeout=1.0):
+    """Send one command to a running instance and return its decoded reply"""
+    import socket
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(command.encode() + b'\n')
+        reply = b''
+        while not reply.endswith(b'\n'):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            reply += chunk
+    return json.loads(reply.decode())
+
+def parse_command_line(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="LED battery monitor for Framework Laptop 16 LED modules")
+    parser.add_argument('--ctl', nargs='+', metavar='COMMAND',
+                        help='send a command to a running instance, e.g. --ctl brightness both 64')
+    parser.add_argument('--state', action='store_true',
+                        help='print the running monitor\'s latest state as JSON (for status bars)')
+    parser.add_argument('--record', metavar='FILE', help='append every frame sent to the modules to FILE')
+    parser.add_argument('--replay', metavar='FILE', help='play back a recording instead of the menu')
+    parser.add_argument('--max-speed', action='store_true', help='replay as fast as possible (benchmark)')
+    parser.add_argument('--emulate', action='store_true',
+                        help='replay or simulate on emulated modules (no hardware needed)')
+    parser.add_argument('--simulate', type=float, metavar='SECONDS',
+                        help='run the monitor on simulated time, battery and music for SECONDS, then exit')
+    parser.add_argument('--speed', type=float, metavar='FACTOR',
+                        help='pace --simulate at FACTOR x real time (default: as fast as possible)')
+    parser.add_argument('--watts', type=float, default=12.0, help='simulated discharge rate (default: 12)')
+    return parser.parse_args(argv)
+
+def replay_recording(path, devices, max_speed=False):
+    replayer = FrameReplayer(path)
+    try:
+        print(f"Replaying {len(replayer)} frames from {path}{' at maximum speed' if max_speed else ''}...")
+        stats = replayer.replay(devices, speed=None if max_speed else 1.0)
+    finally:
+        replayer.close()
+    fps = f"{stats['fps']:.1f}" if stats['fps'] else "n/a"
+    print(f"✓ {stats['frames']} frames, {stats['bytes']} bytes in {stats['seconds']:.2f}s ({fps} frames/s)")
+    return stats
+
+cli_args = parse_command_line(sys.argv[1:]) if __name__ == "__main__" else None
+
+# Command-line client: `leds.py --ctl brightness both 64` talks to a running instance
+if cli_args and cli_args.ctl:
+    try:
+        reply = send_control_command(' '.join(cli_args.ctl))
+    except OSError as e:
+        print(f"Could not reach running monitor on {CONTROL_SOCKET}: {e}")
+        sys.exit(1)
+    print(json.dumps(reply))
+    sys.exit(0 if reply.get('ok') else 1)
+
+# Status bar helper: `leds.py --state` reads the shared snapshot, no socket or sensors involved
+if cli_args and cli_args.state:
+    try:
+        reader = StateReader()
+    except (OSError, ValueError):
+        print(json.dumps({'running': False}))
+        sys.exit(1)
+    state = reader.read()
+    reader.close()
+    print(json.dumps(state if state is not None else {'running': False}))
+    sys.exit(0 if state and state.get('running') else 1)
+
+# Replay to emulated modules doesn't need any hardware
+if cli_args and cli_args.replay and cli_args.emulate:
+    replay_recording(cli_args.replay, {0: EmulatedModule('left'), 1: EmulatedModule('right')}, cli_args.max_speed)
+    sys.exit(0)
+
+def find_serial_port():
+    """Find available serial ports"""
+    # Common Linux serial port patterns
+    ports = glob.glob('/dev/ttyUSB*') + glob.glob('/dev/ttyACM*') + glob.glob('/dev/ttyS*')
+    
+    if not ports:
+        print("No serial ports found. Common Linux ports:")
+        print("  /dev/ttyUSB0, /dev/ttyUSB1, ... (USB-to-serial adapters)")
+        print("  /dev/ttyACM0, /dev/ttyACM1, ... (Arduino, etc.)")
+        print("  /dev/ttyS0, /dev/ttyS1, ... (built-in serial ports)")
+        return None
+    
+    return ports[0]  # Return first available port
+
+# Simulations can run on emulated modules, no hardware needed
+emulate_modules = bool(cli_args and cli_args.simulate is not None and cli_args.emulate)
+if emulate_modules:
+    serial_port = time_port = None
+    ser, ser_time = EmulatedModule('left'), EmulatedModule('right')
+else:
+    # Try to find the correct serial port
+    serial_port = find_serial_port()
+    if serial_port is None:
+        print("Please check your serial device connection and update COM_PORT variable")
+        exit(1)
+
+    # Find second serial port for time display
+    available_ports = glob.glob('/dev/ttyUSB*') + glob.glob('/dev/ttyACM*') + glob.glob('/dev/ttyS*')
+    time_port = None
+    for port in available_ports:
+        if port != serial_port:
+            time_port = port
+            break
+
+    try:
+        ser = serial.Serial(serial_port, BAUD_RATE, timeout=1, write_timeout=SERIAL_WRITE_TIMEOUT)
+    except serial.SerialException as e:
+        print(f"Failed to open serial port {serial_port}: {e}")
+        print("Make sure:")
+        print("1. Your device is connected")
+        print("2. You have permission to access the serial port (try: sudo usermod -a -G dialout $USER)")
+        print("3. No other program is using the port")
+        exit(1)
+
+    # Try to connect to second LED for time display
+    ser_time = None
+    if time_port:
+        try:
+            ser_time = serial.Serial(time_port, BAUD_RATE, timeout=1, write_timeout=SERIAL_WRITE_TIMEOUT)
+        except serial.SerialException as e:
+            print(f"Could not connect to time display on {time_port}: {e}")
+            print("Time display will be disabled")
+
+class ModulePower:
+    """Firmware sleep/wake for one module
+
+    A module that has shown nothing (blank frame) or no new frame for
+    module_sleep_timeout seconds is put to sleep instead of being fed the same
+    frame; anything written to it afterwards wakes it first.
+    """
+
+    def __init__(self, serial_port):
+        self.serial_port = serial_port
+        self.asleep = False
+        self.quiet_since = None  # When the module last started being blank/unchanged
+        self.sleeps = 0
+
+    def sleep(self):
+        if not self.asleep:
+            channel_for(self.serial_port).command(bytes((0x32, 0xAC, CMD_SLEEP, 1)))
+            self.asleep = True
+            self.sleeps += 1
+
+    def wake(self):
+        if self.asleep:
+            self.asleep = False
+            channel_for(self.serial_port).command(bytes((0x32, 0xAC, CMD_SLEEP, 0)))
+
+    def should_sleep(self, quiet, timeout, now=None):
+        """Track blank/unchanged time; returns True once the module has been quiet long enough"""
+        if not quiet:
+            self.quiet_since = None
+            return False
+        now = clock.monotonic() if now is None else now
+        if self.quiet_since is None:
+            self.quiet_since = now
+        return timeout > 0 and now - self.quiet_since >= timeout
+
+module_power = {}  # serial port -> ModulePower
+
+def wake_if_sleeping(serial_port):
+    power = module_power.get(serial_port)
+    if power is not None and power.asleep:
+        power.wake()
+
+def send_frame(columns, serial_port=ser, lut=IDENTITY_LUT):
+    """Send a full frame, as a packed bitmap when it is pure on/off; returns bytes written
+
+    Low level - callers other than DeviceChannel must go through channel_for(port).
+    """
+    scaled = scale_frame(columns, lut)
+    if frame_recorder is not None:
+        frame_recorder.record(recording_device_ids.get(serial_port, 255), scaled)
+    wake_if_sleeping(serial_port)
+    data = encode_frame(scaled)
+    serial_port.write(data)
+    return len(data)
+
+class DeviceChannel:
+    """The one way to write to a module: whole frames and commands, one at a time
+
+    The render loop, the pool's writer threads, the menu and the control
+    socket all hand the channel complete frames, which go out as a single
+    write under the module's lock - packets from two frames can't interleave.
+    The last frame is kept unscaled, so a brightness change re-sends it at
+    once with the new table (jumping ahead of the next render) rather than
+    drawing anything new over it.
+    """
+
+    def __init__(self, serial_port):
+        self.serial_port = serial_port
+        self.lock = threading.RLock()  # Reentrant: waking a sleeping module writes from inside send()
+        self.columns = None  # Last frame, before brightness
+        self.lut = IDENTITY_LUT
+        self.frames = 0
+        self.priority_frames = 0
+
+    def send(self, columns, lut=IDENTITY_LUT):
+        """Write one whole frame; returns bytes written"""
+        with self.lock:
+            written = send_frame(columns, self.serial_port, lut)
+            self.columns = [list(column) for column in columns]  # The caller may draw into its own copy next
+            self.lut = lut
+            self.frames += 1
+        return written
+
+    def command(self, data):
+        with self.lock:
+            self.serial_port.write(data)
+
+    def set_brightness(self, lut):
+        """Show the current frame with a new brightness table now; False if nothing is up yet"""
+        power = module_power.get(self.serial_port)
+        with self.lock:
+            if self.columns is None or (power is not None and power.asleep):
+                return False
+            send_frame(self.columns, self.serial_port, lut)
+            self.lut = lut
+            self.priority_frames += 1
+        return True
+
+device_channels = {}  # serial port -> DeviceChannel
+
+def channel_for(serial_port):
+    channel = device_channels.get(serial_port)
+    if channel is None:
+        channel = device_channels.setdefault(serial_port, DeviceChannel(serial_port))
+    return channel
+
+def show_frame(serial_port, columns, brightness_scale=1.0):
+    """Draw a [col][row] frame from outside the render loop (menu tests and previews)"""
+    lut = IDENTITY_LUT if brightness_scale == 1.0 else brightness_lut(MAX_BRIGHT * brightness_scale)
+    return channel_for(serial_port).send(columns, lut)
+
+def clear_all_leds(serial_port=ser, width=WIDTH, height=HEIGHT):
+    """Turn off all LEDs"""
+    channel_for(serial_port).send([[0] * height for _ in range(width)])
+
+def matrix_to_columns(matrix):
+    """Convert a [row][col] matrix (time/music renderers) to [col][row] columns"""
+    return [list(column) for column in zip(*matrix)]
+
+class Layer:
+    """One stacked image on a module, tracking which columns changed
+
+    opaque layers cover everything below them; non-opaque layers treat 0 as
+    transparent so e.g. an alert can sit on top of the battery gauge.
+    """
+
+    def __init__(self, name, z=0, opacity=1.0, opaque=True, visible=True, width=WIDTH, height=HEIGHT):
+        self.name = name
+        self.z = z
+        self.opacity = opacity
+        self.opaque = opaque
+        self.visible = visible
+        self.width = width
+        self.height = height
+        self.columns = None
+        self.key = None
+        self.dirty = set()
+
+    def set_columns(self, columns):
+        """Replace the layer content and mark only the columns that differ"""
+        if self.columns is None:
+            self.dirty.update(range(self.width))
+        else:
+            for col in range(self.width):
+                if columns[col] != self.columns[col]:
+                    self.dirty.add(col)
+        self.columns = columns
+
+    def update(self, key, render):
+        """Re-render only when key changed (e.g. the minutes shown by the time layer)"""
+        if self.columns is not None and key == self.key:
+            return
+        self.key = key
+        self.set_columns(render())
+
+    def set_visible(self, visible):
+        if visible != self.visible:
+            self.visible = visible
+            self.dirty.update(range(self.width))
+
+    def set_opacity(self, opacity):
+        opacity = max(0.0, min(1.0, opacity))
+        if opacity != self.opacity:
+            self.opacity = opacity
+            self.dirty.update(range(self.width))
+
+    def covers(self):
+        """True if nothing underneath can show through"""
+        return self.visible and self.opaque and self.opacity >= 1.0 and self.columns is not None
+
+# Mode transitions (battery <-> progress bar, time <-> scrolling text, ...)
+@functools.lru_cache(maxsize=None)
+def fade_tables(step, steps):
+    """(outgoing, incoming) 256-byte scale tables for one crossfade step - their sums never exceed 255"""
+    t = step / float(steps)
+    return bytes(int(v * (1.0 - t)) for v in range(256)), bytes(int(v * t) for v in range(256))
+
+@functools.lru_cache(maxsize=256)
+def transition_frame(style, step, steps, outgoing, incoming):
+    """Intermediate frame between two frames given as tuples of column bytes
+
+    Cached, so a transition between static frames (battery gauge -> progress
+    bar) is only blended once per step, however often it is replayed.
+    """
+    import operator
+
+    if style == 'wipe':
+        # Incoming content grows down from the top
+        boundary = len(incoming[0]) * step // steps
+        return tuple(new[:boundary] + old[boundary:] for old, new in zip(outgoing, incoming))
+    fade_out, fade_in = fade_tables(step, steps)
+    return tuple(bytes(map(operator.add, old.translate(fade_out), new.translate(fade_in)))
+                 for old, new in zip(outgoing, incoming))
+
+FRAME_KEEPALIVE = 30.0  # Re-send an unchanged frame this often, in case the module reset or slept by itself
+
+class Compositor:
+    """Stack layers for one module; recompose dirty columns, skip unchanged frames
+
+    The firmware zeroes its column staging buffer on every flush, so a frame
+    that changed at all has to be restaged in full - but a frame identical to
+    what the module already shows is not sent at all. When the topmost opaque
+    layer changes (the display mode), the switch is crossfaded or wiped over
+    a few frames instead of happening in one.
+    """
+
+    def __init__(self, width=WIDTH, height=HEIGHT):
+        self.width = width
+        self.height = height
+        self.layers = []
+        self.composed = [[0] * height for _ in range(width)]
+        self.sent = None  # Columns as last written to the device
+        self.sent_lut = None
+        self.sent_at = None  # clock.monotonic() of the last write
+        self.shown = None  # Last frame written, kept across sleep/invalidate to spot new content
+        self.shown_lut = None
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.mode = None  # Name of the topmost opaque layer
+        self.transition = None  # [outgoing frame, step] while switching modes
+
+    def add_layer(self, layer):
+        self.layers.append(layer)
+        self.layers.sort(key=lambda l: l.z)
+        layer.dirty.update(range(self.width))
+        return layer
+
+    def invalidate(self):
+        """Forget what the device shows (someone else wrote to it) - next commit sends everything"""
+        self.sent = None
+
+    def suspend(self, serial_port):
+        """Put the module to sleep now (display disabled / monitoring stopped)"""
+        power = module_power.get(serial_port)
+        if power is not None:
+            power.sleep()
+            self.sent = None  # Wake-up pushes the current frame
+
+    def compose(self):
+        """Recompose dirty columns; returns the set of columns that were recomposed"""
+        dirty = set()
+        for layer in self.layers:
+            if layer.dirty:
+                dirty |= layer.dirty
+                layer.dirty = set()
+        if not dirty:
+            return dirty
+
+        # Start from the topmost layer that hides everything below it
+        start = 0
+        for i in range(len(self.layers) - 1, -1, -1):
+            if self.layers[i].covers():
+                start = i
+                break
+        stack = [l for l in self.layers[start:] if l.visible and l.columns is not None and l.opacity > 0]
+
+        for col in dirty:
+            out = [0] * self.height
+            for layer in stack:
+                values = layer.columns[col]
+                alpha = layer.opacity
+                if layer.opaque:
+                    if alpha >= 1.0:
+                        out = list(values)
                     else:
-                        charge_rate = 0
-                        discharge_rate = 0
-                        
-        except Exception as e:
-            print(f"Error reading Linux power info: {e}")
-            charge_rate = 0
-            discharge_rate = 0
-    
-    return percentage, charge_rate, discharge_rate, time_remaining_minutes
+                        out = [int(b + (v - b) * alpha) for v, b in zip(values, out)]
+                elif alpha >= 1.0:
+                    out = [v if v else b for v, b in zip(values, out)]
+                else:
+                    out = [int(b + (v - b) * alpha) if v else b for v, b in zip(values, out)]
+            self.composed[col] = out
+        return dirty
 
-def find_serial_port():
-    """Find available serial ports"""
-    # Common Linux serial port patterns
-    ports = glob.glob('/dev/ttyUSB*') + glob.glob('/dev/ttyACM*') + glob.glob('/dev/ttyS*')
-    
-    if not ports:
-        print("No serial ports found. Common Linux ports:")
-        print("  /dev/ttyUSB0, /dev/ttyUSB1, ... (USB-to-serial adapters)")
-        print("  /dev/ttyACM0, /dev/ttyACM1, ... (Arduino, etc.)")
-        print("  /dev/ttyS0, /dev/ttyS1, ... (built-in serial ports)")
+    def current_mode(self):
+        for layer in reversed(self.layers):
+            if layer.covers():
+                return layer.name
         return None
-    
-    return ports[0]  # Return first available port
 
-# Try to find the correct serial port
-serial_port = find_serial_port()
-if serial_port is None:
-    print("Please check your serial device connection and update COM_PORT variable")
-    exit(1)
-
-# Find second serial port for time display
-available_ports = glob.glob('/dev/ttyUSB*') + glob.glob('/dev/ttyACM*') + glob.glob('/dev/ttyS*')
-time_port = None
-for port in available_ports:
-    if port != serial_port:
-        time_port = port
-        break
-
-try:
-    ser = serial.Serial(serial_port, BAUD_RATE, timeout=1)
-except serial.SerialException as e:
-    print(f"Failed to open serial port {serial_port}: {e}")
-    print("Make sure:")
-    print("1. Your device is connected")
-    print("2. You have permission to access the serial port (try: sudo usermod -a -G dialout $USER)")
-    print("3. No other program is using the port")
-    exit(1)
-
-# Try to connect to second LED for time display
-ser_time = None
-if time_port:
+    def transition_step(self, config):
+        """Frame to show this commit: the composed frame, or a step of a running transition"""
+        mode = self.current_mode()
+        if mode != self.mode:
+            # Only animate between two real frames (not after a clear, wake or first draw)
+            if (self.mode is not None and self.sent is not None and
+                    config.transition != 'off' and config.transition_frames > 1):
+                self.transition = [tuple(scale_frame(self.sent)), 0]
+            self.mode = mode
+        if self.transition is None:
+            return self.composed
+        self.transition[1] += 1
+        outgoing, step = self.transition
+        if step >= config.transition_frames:
+            self.transition = None
+            return self.composed
+        return list(transition_frame(config.transition, step, config.transition_frames,
+                                     outgoing, tuple(scale_frame(self.composed))))
+
+    def commit(self, serial_port, lut, sleep_timeout=0):
+        """Compose and send the frame if it differs from the device; returns True if sent
+
+        An unchanged frame is still re-sent every FRAME_KEEPALIVE seconds, so
+        a module that reset by itself doesn't stay dark. With a sleep_timeout, a module that stays blank or unchanged that long
+        is put to sleep; it wakes (and gets the current frame) as soon as there
+        is a new frame to show. Auto-dim alone never puts a module to sleep.
+        """
+        self.compose()
+        frame = self.transition_step(render_config)
+        power = module_power.get(serial_port)
+        if power is not None:
+            blank = not any(map(any, self.composed))
+            unchanged = self.shown is not None and lut is self.shown_lut and frame == self.shown
+            if power.should_sleep(blank or unchanged, sleep_timeout):
+                if not power.asleep:
+                    power.sleep()
+                    self.sent = None
+                return False
+        now = clock.monotonic()
+        if (self.sent is not None and lut is self.sent_lut and frame == self.sent and
+                now - self.sent_at < FRAME_KEEPALIVE):
+            return False
+        self.bytes_sent += channel_for(serial_port).send(frame, lut)
+        self.sent_at = now
+        self.frames_sent += 1
+        self.sent = self.shown = list(frame)
+        self.sent_lut = self.shown_lut = lut
+        return True
+
+class VirtualCanvas:
+    """One wide image spanning several modules, split into per-module column views
+
+    Renderers draw once into a single column-major bytearray (x * height + y).
+    The columns of each attached layer are memoryviews into that buffer, so
+    splitting the canvas between modules copies nothing; end_frame() only
+    works out which columns changed and marks them dirty on the owning layer.
+    Gap columns between modules are drawn into but never shown, so content
+    keeps its speed while it crosses the physical gap.
+    """
+
+    def __init__(self, layers, gap=0, height=HEIGHT):
+        self.layers = layers
+        self.height = height
+        self.gap = None
+        self.set_gap(gap)
+
+    def set_gap(self, gap):
+        """(Re)build the buffer for a given gap between neighbouring modules"""
+        gap = max(0, gap)
+        if gap == self.gap:
+            return
+        self.gap = gap
+        self.offsets = []
+        x = 0
+        for layer in self.layers:
+            self.offsets.append(x)
+            x += layer.width + gap
+        self.width = x - gap
+        self.buffer = bytearray(self.width * self.height)
+        self.blank = bytes(len(self.buffer))
+        self.previous = self.blank
+        view = memoryview(self.buffer)
+        h = self.height
+        for layer, x0 in zip(self.layers, self.offsets):
+            layer.columns = [view[(x0 + c) * h:(x0 + c + 1) * h] for c in range(layer.width)]
+            layer.dirty.update(range(layer.width))
+
+    def clear(self):
+        self.buffer[:] = self.blank
+
+    def set(self, x, y, value=MAX_BRIGHT):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.buffer[x * self.height + y] = value
+
+    def fill_rect(self, x, y, width, height, value=MAX_BRIGHT):
+        y0, y1 = max(0, y), min(self.height, y + height)
+        if y1 <= y0:
+            return
+        run = bytes((value,)) * (y1 - y0)
+        for col in range(max(0, x), min(self.width, x + width)):
+            start = col * self.height
+            self.buffer[start + y0:start + y1] = run
+
+    def end_frame(self):
+        """Mark the columns that changed since the last frame dirty on their layers"""
+        h = self.height
+        buffer, previous = self.buffer, self.previous
+        for layer, x0 in zip(self.layers, self.offsets):
+            for c in range(layer.width):
+                start = (x0 + c) * h
+                if buffer[start:start + h] != previous[start:start + h]:
+                    layer.dirty.add(c)
+        self.previous = bytes(buffer)
+
+# Left module: battery gauge, replaced by the track progress bar while music plays
+battery_compositor = Compositor(WIDTH, HEIGHT)
+battery_layer = battery_compositor.add_layer(Layer('battery', z=0))
+cpu_layer = battery_compositor.add_layer(Layer('cpu', z=5, visible=False))
+progress_layer = battery_compositor.add_layer(Layer('progress', z=10, visible=False))
+battery_overlay_layer = battery_compositor.add_layer(Layer('overlay', z=100, opaque=False, visible=False))
+
+# Right module: time remaining, replaced by scrolling artist/title while music plays
+time_compositor = Compositor(TIME_WIDTH, TIME_HEIGHT)
+time_layer = time_compositor.add_layer(Layer('time', z=0, width=TIME_WIDTH, height=TIME_HEIGHT))
+text_layer = time_compositor.add_layer(Layer('text', z=10, visible=False, width=TIME_WIDTH, height=TIME_HEIGHT))
+spectrum_layer = time_compositor.add_layer(Layer('spectrum', z=11, visible=False, width=TIME_WIDTH, height=TIME_HEIGHT))
+art_layer = time_compositor.add_layer(Layer('art', z=11, visible=False, width=TIME_WIDTH, height=TIME_HEIGHT))
+time_overlay_layer = time_compositor.add_layer(Layer('overlay', z=100, opaque=False, visible=False,
+                                                     width=TIME_WIDTH, height=TIME_HEIGHT))
+
+# Both modules as one canvas (left module, gap, right module) for content that wants the width
+battery_span_layer = battery_compositor.add_layer(Layer('span', z=12, visible=False))
+time_span_layer = time_compositor.add_layer(Layer('span', z=12, visible=False, width=TIME_WIDTH, height=TIME_HEIGHT))
+span_canvas = VirtualCanvas([battery_span_layer, time_span_layer], settings['span_gap'])
+
+# Desktop notifications briefly cover whatever the module shows
+battery_notify_layer = battery_compositor.add_layer(Layer('notify', z=50, visible=False))
+time_notify_layer = time_compositor.add_layer(Layer('notify', z=50, visible=False,
+                                                    width=TIME_WIDTH, height=TIME_HEIGHT))
+
+# Device pool: the two built-in modules plus any extra LED matrices (e.g. on a hub)
+LED_MATRIX_USB_ID = ('32ac', '0020')  # Framework LED Matrix vendor/product id
+MODULE_ROLES = ('battery', 'time', 'cpu', 'off')  # battery/time mirror the built-in modules
+
+def is_led_matrix(port_path):
+    """True if the tty belongs to a Framework LED Matrix, going by its USB ids in sysfs"""
+    device = os.path.realpath(f"/sys/class/tty/{os.path.basename(port_path)}/device")
+    # The tty hangs off a USB interface; the ids are on the interface's parent
+    for path in (device, os.path.dirname(device)):
+        try:
+            with open(os.path.join(path, 'idVendor')) as f:
+                vendor = f.read().strip()
+            with open(os.path.join(path, 'idProduct')) as f:
+                product = f.read().strip()
+        except OSError:
+            continue
+        return (vendor, product) == LED_MATRIX_USB_ID
+    return False
+
+def find_extra_modules():
+    """LED matrices beyond the battery and time modules
+
+    Only ports that identify as an LED Matrix are used, so we never write
+    to some other USB serial device that happens to be plugged in.
+    """
+    used = {serial_port, time_port}
+    return [p for p in sorted(glob.glob('/dev/ttyACM*')) if p not in used and is_led_matrix(p)]
+
+class LedDevice:
+    """One module in the pool: serial handle, role and its own compositor
+
+    Extra modules showing 'battery' or 'time' mirror the built-in module's
+    composed frame (source) instead of rendering it a second time.
+    """
+
+    def __init__(self, serial_port, role, compositor, device_id, primary=False, source=None):
+        self.serial_port = serial_port
+        self.role = role
+        self.compositor = compositor
+        self.device_id = device_id
+        self.primary = primary
+        self.source = source
+        self.layer = None  # Content layer of an extra module
+        self.pending = None  # In-flight commit
+        self.pending_since = None
+        self.late = 0  # Frames skipped because the previous write was still going
+        self.failed = None  # Last write error; the module is skipped until the watchdog reopens it
+        self.errors = 0
+
+    def write_failed(self, error):
+        self.failed = error
+        self.errors += 1
+        log('error', f"Write to module {self.device_id} ({self.role}) failed: {error!r}",
+            key=('write', self.device_id))
+
+class DevicePool:
+    """All connected modules; each frame is written to all of them in parallel
+
+    Serial writes release the GIL, so with one writer thread per module a
+    frame costs about as long as the slowest module rather than the sum of
+    all of them. A module still busy with its previous frame when the next
+    one is due skips that frame instead of queueing behind it.
+    """
+
+    def __init__(self):
+        self.devices = []
+        self.executor = None
+        self.frames_skipped = 0
+
+    def add(self, serial_port, role, compositor, primary=False, source=None):
+        device = LedDevice(serial_port, role, compositor, len(self.devices), primary, source)
+        self.devices.append(device)
+        recording_device_ids[serial_port] = device.device_id
+        module_power[serial_port] = ModulePower(serial_port)
+        # We may have left it asleep on a previous run
+        channel_for(serial_port).command(bytes((0x32, 0xAC, CMD_SLEEP, 0)))
+        return device
+
+    def extras(self):
+        return [d for d in self.devices if not d.primary]
+
+    def has_role(self, role):
+        return any(d.role == role for d in self.devices if not d.primary)
+
+    def commit(self, jobs, deadline):
+        """Send [(device, lut, sleep_timeout), ...]; returns {device: sent}
+
+        Frames are composed here on the caller's thread, so mirrors copy a
+        finished frame and the writer threads only encode and write.
+        """
+        import concurrent.futures
+
+        results = {}
+        ready = []
+        for job in jobs:
+            device = job[0]
+            if device.pending_since is not None and device.pending.done():
+                self.collect(device)  # Finished after its frame's deadline - don't lose an error
+            if device.failed is not None:
+                results[device] = False
+            elif device.pending is not None and not device.pending.done():
+                device.late += 1
+                self.frames_skipped += 1
+                results[device] = False
+            else:
+                ready.append(job)
+        for device, *_ in ready:
+            if device.source is None:
+                device.compositor.compose()
+        for device, *_ in ready:
+            if device.source is not None:
+                device.layer.set_columns(list(device.source.composed))
+                device.compositor.compose()
+
+        if len(ready) < 2:
+            for device, lut, sleep_timeout in ready:
+                try:
+                    results[device] = device.compositor.commit(device.serial_port, lut, sleep_timeout)
+                except (serial.SerialException, OSError) as e:
+                    device.write_failed(e)
+                    results[device] = False
+            return results
+
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(2, len(self.devices)),
+                                                                  thread_name_prefix='led-write')
+        now = clock.monotonic()
+        for device, lut, sleep_timeout in ready:
+            device.pending = self.executor.submit(device.compositor.commit, device.serial_port,
+                                                  lut, sleep_timeout)
+            device.pending_since = now
+        concurrent.futures.wait([job[0].pending for job in ready], timeout=deadline)
+        for device, *_ in ready:
+            # A module that's still writing finishes in the background
+            results[device] = self.collect(device) if device.pending.done() else False
+        return results
+
+    def collect(self, device):
+        """Result of a finished background write (False if it raised)"""
+        device.pending_since = None
+        error = device.pending.exception()
+        if error is None:
+            return device.pending.result()
+        if not isinstance(error, (serial.SerialException, OSError)):
+            raise error
+        device.write_failed(error)
+        return False
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+device_pool = DevicePool()
+battery_device = device_pool.add(ser, 'battery', battery_compositor, primary=True)
+time_device = device_pool.add(ser_time, 'time', time_compositor, primary=True) if ser_time else None
+
+for path in ([] if emulate_modules else find_extra_modules()):
+    role = settings['module_roles'].get(path, 'cpu')
+    if role not in MODULE_ROLES:
+        role = 'cpu'
     try:
-        ser_time = serial.Serial(time_port, BAUD_RATE, timeout=1)
+        port = serial.Serial(path, BAUD_RATE, timeout=1, write_timeout=SERIAL_WRITE_TIMEOUT)
     except serial.SerialException as e:
-        print(f"Could not connect to time display on {time_port}: {e}")
-        print("Time display will be disabled")
+        print(f"Could not connect to extra LED module on {path}: {e}")
+        continue
+    source = {'battery': battery_compositor, 'time': time_compositor}.get(role)
+    compositor = Compositor(WIDTH, HEIGHT)
+    device = device_pool.add(port, role, compositor, source=source)
+    device.layer = compositor.add_layer(Layer(role, z=0))
 
-def send_column(column_id, values, serial_port=ser, brightness_scale=1.0):
-    cmd = [0x32, 0xAC, CMD_STAGE_COL, column_id]
-    for val in values:
-        scaled_val = int(val * brightness_scale)
-        val = max(0, min(255, scaled_val))
-        cmd.append(val)
-    serial_port.write(bytearray(cmd))
+# System suspend / resume
+def reopen_serial(serial_port, attempts=10, delay=0.1):
+    """Reopen a handle in place (same object, so module_power etc. stay keyed on it)
 
-def send_flush(serial_port=ser):
-    cmd = [0x32, 0xAC, CMD_FLUSH_COLS]
-    serial_port.write(bytearray(cmd))
+    The USB CDC link can drop across suspend; the device usually reappears
+    within a few hundred milliseconds of resume.
+    """
+    for attempt in range(attempts):
+        try:
+            if serial_port.is_open:
+                serial_port.close()
+            serial_port.open()
+            return True
+        except (serial.SerialException, OSError):
+            time.sleep(delay)
+    return False
 
-def clear_all_leds(serial_port=ser, width=WIDTH, height=HEIGHT):
-    """Turn off all LEDs"""
-    for col in range(width):
-        send_column(col, [0] * height, serial_port)
-    send_flush(serial_port)
+def suspend_modules():
+    """System is about to sleep: put the modules to sleep so they're dark while suspended"""
+    for device in device_pool.devices:
+        compositor, port = device.compositor, device.serial_port
+        try:
+            compositor.suspend(port)
+        except (serial.SerialException, OSError):
+            pass  # Already gone - reopened by the watchdog once a write fails
+    monitor_status['suspended'] = True
+
+def resume_modules():
+    """After resume: full redraw and no stale sensor history, without blocking the frame
+
+    Handles are left alone - a module whose link dropped fails its next write
+    and the watchdog reopens just that one.
+    """
+    for device in device_pool.devices:
+        power = module_power[device.serial_port]
+        power.asleep = True  # Unknown after a power cycle - make the next frame send a wake
+        power.quiet_since = None
+        device.compositor.invalidate()
+    battery_estimator.reset()
+    # Fresh sample on the scheduler thread; until it lands the last reading is shown
+    provider_scheduler.refresh_soon(battery_provider)
+    monitor_status['suspended'] = False
+
+# Render loop supervision
+WATCHDOG_INTERVAL = 0.5  # Seconds between health checks
+WATCHDOG_STALL_GRACE = 2.0  # Seconds past the next frame's due time before the loop counts as stalled
+WATCHDOG_WRITE_STALL = 2.0  # Seconds a background write may stay in flight before its module is reopened
+WATCHDOG_BACKOFF = (0.5, 30.0)  # First and longest wait between restarts of a failing loop
+
+class RenderWatchdog:
+    """Keep the render loop running: heartbeats, stuck writes, crashes
+
+    The loop calls beat(delay) after every frame. Twice a second the watchdog
+    thread checks that the next beat isn't overdue and that no module has a
+    failed or hung write. A module with a bad write is reopened in place; a
+    loop that crashed or stopped beating is replaced by a fresh one. Python
+    can't kill a wedged thread, so the old loop is only abandoned - it exits
+    by itself once it sees it's no longer the current generation. Repeated
+    restarts back off exponentially, and every stall, restart and reopen is
+    counted in monitor_status and logged.
+    """
+
+    def __init__(self, interval=WATCHDOG_INTERVAL):
+        self.interval = interval
+        self.loop = None
+        self.generation = 0
+        self.loop_thread = None
+        self.next_beat = None  # clock.monotonic() by which the next frame should be done
+        self.crashed = False
+        self.finished = False  # Loop returned on its own (e.g. no battery data)
+        self.backoff = WATCHDOG_BACKOFF[0]
+        self.restart_at = None
+        self.last_restart = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stalls = 0
+        self.restarts = 0
+        self.reopens = 0
+
+    def beat(self, delay):
+        self.next_beat = clock.monotonic() + delay
+
+    def current(self, generation):
+        """Should the loop of this generation keep going?"""
+        return generation == self.generation and not self.stop_event.is_set()
+
+    def start(self, loop):
+        """Run loop(generation) on a supervised thread until stop()"""
+        self.loop = loop
+        self.stop_event.clear()
+        self.backoff = WATCHDOG_BACKOFF[0]
+        self.restart_at = None
+        self._spawn()
+        self.thread = threading.Thread(target=self._watch, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.generation += 1
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+        if self.loop_thread is not None:
+            self.loop_thread.join(timeout=2.0)
+            self.loop_thread = None
+
+    def _spawn(self):
+        self.generation += 1
+        self.crashed = False
+        self.finished = False
+        # A loop that hangs in its very first frame must count as stalled too
+        self.next_beat = clock.monotonic() + render_config.frame_time
+        self.loop_thread = threading.Thread(target=self._guard, args=(self.generation,), daemon=True)
+        self.loop_thread.start()
+
+    def _guard(self, generation):
+        import traceback
+
+        try:
+            self.loop(generation)
+        except Exception as e:
+            if self.current(generation):
+                log('error', f"Render loop crashed: {e!r}\n{traceback.format_exc()}")
+                self.crashed = True
+            return
+        if self.current(generation):
+            self.finished = True
+
+    def _watch(self):
+        while not self.stop_event.wait(self.interval):
+            now = clock.monotonic()
+            self.check_devices(now)
+            self.check_loop(now)
+            monitor_status.update(stalls=self.stalls, restarts=self.restarts, reopens=self.reopens)
+
+    def check_devices(self, now):
+        for device in device_pool.devices:
+            hung = (device.pending_since is not None and not device.pending.done() and
+                    now - device.pending_since > WATCHDOG_WRITE_STALL)
+            if device.failed is None and not hung:
+                continue
+            if hung:
+                self.stalls += 1
+                device.pending_since = now  # Give the close a chance before counting it again
+                log('warning', f"Module {device.device_id} ({device.role}) write hung", key=('hung', device.device_id))
+                # The writer holds the channel lock: closing under it makes the stuck write fail,
+                # and the failed write gets the port reopened on a later check
+                try:
+                    device.serial_port.close()
+                except (serial.SerialException, OSError):
+                    pass
+                continue
+            with channel_for(device.serial_port).lock:  # Not while a frame is going out
+                reopened = reopen_serial(device.serial_port, attempts=3)
+            if reopened:
+                self.reopens += 1
+                power = module_power[device.serial_port]
+                power.asleep = True  # State unknown - the next frame sends a wake first
+                power.quiet_since = None
+                device.compositor.invalidate()
+                device.failed = None
+                log('info', f"Reopened module {device.device_id} ({device.role})", key=('reopen', device.device_id))
+
+    def check_loop(self, now):
+        if self.finished:
+            return
+        if self.restart_at is not None:
+            if now >= self.restart_at:
+                self.restart_at = None
+                self.restarts += 1
+                self.last_restart = now
+                log('warning', f"Restarting render loop (restart {self.restarts})")
+                self._spawn()
+            return
+        stalled = self.next_beat is not None and now > self.next_beat + WATCHDOG_STALL_GRACE
+        if stalled:
+            self.stalls += 1
+            log('warning', f"Render loop stalled for {now - self.next_beat:.1f}s")
+        if stalled or self.crashed:
+            self.generation += 1  # Abandon it; a wedged thread exits when it wakes
+            self.restart_at = now + self.backoff
+            self.backoff = min(self.backoff * 2, WATCHDOG_BACKOFF[1])
+        elif self.last_restart is not None and now - self.last_restart > WATCHDOG_BACKOFF[1]:
+            self.backoff = WATCHDOG_BACKOFF[0]  # Healthy for a while: forget earlier trouble
+            self.last_restart = None
+
+render_watchdog = RenderWatchdog()
 
 def show_main_menu():
     """Display main menu and handle all interactions"""
-    global last_activity_time
-    
     # Update activity time when showing menu (user interaction)
-    last_activity_time = time.time()
+    register_activity()
     
     while True:
         clear_screen()
@@ -342,7 +3765,7 @@ def show_main_menu():
             choice = input("Select option (0-9): ").strip()
             
             # Update activity time on any menu interaction
-            last_activity_time = time.time()
+            register_activity()
             
             if choice == '0':
                 clear_screen()
@@ -372,7 +3795,7 @@ def show_main_menu():
             elif choice == '9':
                 settings['dim_timeout'] = 0
                 save_settings()
-                last_activity_time = time.time()  # Reset activity time
+                register_activity()  # Reset activity time
                 print("✓ Auto-dim disabled - LEDs will stay at set brightness")
                 input("Press Enter to continue...")
             else:
@@ -384,6 +3807,234 @@ def show_main_menu():
             print("Returning to menu...")
             time.sleep(1)
 
+SUSPEND_MAX_AWAKE = 5.0  # Seconds of CLOCK_MONOTONIC in the suspended state before we assume a missed resume
+
+class MonitorState:
+    """Animation and suspend bookkeeping carried from one frame to the next"""
+
+    def __init__(self, generation=None):
+        self.generation = generation  # Watchdog generation of the loop that owns this state (None = unsupervised)
+        self.pulse_pos = None
+        self.pulse_fade = 0.0
+        self.scroll_offset = 0
+        self.suspended = False
+        self.suspended_at = None  # clock.monotonic() when the modules were put to sleep
+        self.suspend_offset = suspend_clock_offset()
+
+def monitor_frame(state):
+    """Render and send one frame; returns seconds until the next one is due, None to stop"""
+    loop_start = clock.monotonic()
+
+    # Suspend/resume: logind warns us before sleeping, the clock gap catches the rest
+    offset = suspend_clock_offset()
+    slept = offset - state.suspend_offset > 1.0
+    state.suspend_offset = offset
+    if sleep_provider.latest and state.suspended and loop_start - state.suspended_at > SUSPEND_MAX_AWAKE:
+        # Monotonic time doesn't run while suspended, so we've been awake all along
+        log('warning', "No resume signal after suspend, resuming anyway", key='suspend-stuck')
+        sleep_provider.set_sleeping(False)
+    if sleep_provider.latest:
+        if not state.suspended:
+            suspend_modules()
+            state.suspended = True
+            state.suspended_at = loop_start
+        sleep_provider.wait_for_resume(0.5)
+        return 0.0
+    if state.suspended or slept:
+        resume_modules()
+        state.suspended = False
+        state.pulse_pos = None
+        state.pulse_fade = 0.0
+        state.scroll_offset = 0
+    # One consistent snapshot per frame - menu/socket changes swap in a new one
+    config = render_config
+    eco_fps_scale, eco_pulse, _ = eco_provider.latest
+    pulse_enabled = config.pulse_enabled and eco_pulse
+
+    # Get battery info (sampled by the provider scheduler, not here)
+    battery_data = battery_provider.latest
+    if battery_data is None or battery_data[0] is None:
+        return None
+
+    # Time remaining comes from the streaming estimator (upower only as fallback)
+    p, charge_rate, discharge_rate, minutes_remaining = battery_data
+
+    # Check for auto-dim
+    dimmed = check_dim_timeout(config) < 1.0
+    time_lut = config.time_dim_lut if dimmed else config.time_lut
+    battery_lut = config.battery_dim_lut if dimmed else config.battery_lut
+
+    # Check if music is playing (FIXED: Only when actually playing)
+    music_info = spotify_provider.latest
+    music_is_playing = (music_info is not None and 
+                      config.music_enabled and
+                      music_info.get('artist', '') != '' and
+                      music_info.get('track', '') != '')
+
+    # Publish for control socket `status` requests
+    monitor_status.update(
+        battery=p,
+        charge_rate=charge_rate,
+        discharge_rate=discharge_rate,
+        minutes_remaining=minutes_remaining,
+        music=music_info if music_is_playing else None,
+        eco_level=eco_provider.level,
+        cpu_percent=eco_provider.cpu_percent,
+        serial_bytes_per_sec=eco_provider.serial_rate,
+    )
+    state_publisher.publish(monitor_status)
+
+    # Frames for every module go out together at the end
+    jobs = []
+
+    # Notification ticker preempts the right module (left if the right one is off)
+    notice = notification_provider.ticker() if config.notifications_enabled else None
+    on_right = ser_time is not None and config.time_enabled
+    time_notify_layer.set_visible(notice is not None and on_right)
+    battery_notify_layer.set_visible(notice is not None and not on_right)
+    if notice is not None:
+        notify_layer = time_notify_layer if on_right else battery_notify_layer
+        notify_layer.update(notice, lambda: matrix_to_columns(create_text_display(*notice)))
+
+    # Spanning mode: one render across both modules, split by the canvas
+    show_span = (music_is_playing and config.music_visualizer == 'span' and ser_time is not None and
+                 config.time_enabled and config.battery_enabled)
+    battery_span_layer.set_visible(show_span)
+    time_span_layer.set_visible(show_span)
+    if show_span:
+        span_canvas.set_gap(config.span_gap)
+        create_span_display(span_canvas, music_info, state.scroll_offset)
+        span_canvas.end_frame()
+        state.scroll_offset += config.music_scroll_speed
+        if state.scroll_offset > span_text_width(music_info) + span_canvas.width:
+            state.scroll_offset = 0
+
+    # Update right LED (time, music text, spectrum or album art)
+    show_spectrum = False
+    if ser_time and config.time_enabled:
+        show_spectrum = (music_is_playing and config.music_visualizer == 'spectrum' and
+                         spectrum_provider.latest is not None)
+        # Cover thumbnail once it's been decoded for this track; text until then
+        art = art_provider.latest if music_is_playing and config.music_visualizer == 'art' else None
+        show_art = art is not None and art[1] is not None and art[0] == music_info.get('art_url')
+        spectrum_layer.set_visible(show_spectrum)
+        art_layer.set_visible(show_art)
+        text_layer.set_visible(music_is_playing and not show_spectrum and not show_span and not show_art)
+        if show_span:
+            pass  # Drawn by the span canvas above
+        elif show_art:
+            art_layer.update(art[0], lambda: art[1])
+        elif show_spectrum:
+            # Bars come from the capture/FFT pipeline on the scheduler thread
+            spectrum_data = spectrum_provider.latest
+            spectrum_layer.update(spectrum_provider.samples,
+                                  lambda: create_spectrum_display(*spectrum_data))
+        elif music_is_playing:
+            # Show music scrolling on right LED
+            text_layer.set_columns(matrix_to_columns(create_music_display(music_info, state.scroll_offset)))
+            # Update scroll for music
+            state.scroll_offset += config.music_scroll_speed
+            if state.scroll_offset > music_text_height(music_info):
+                state.scroll_offset = -TIME_HEIGHT
+        else:
+            # Show normal time on right LED (only re-rendered when the minutes change)
+            time_layer.update(minutes_remaining,
+                              lambda: matrix_to_columns(create_time_display(minutes_remaining)))
+        jobs.append((time_device, time_lut, config.module_sleep_timeout))
+    elif ser_time:
+        time_compositor.suspend(ser_time)
+
+    # Update left LED (battery or progress)
+    if ser and config.battery_enabled:
+        progress_layer.set_visible(music_is_playing and not show_span)
+        cpu_mode = config.left_mode == 'cpu' and not music_is_playing
+        cpu_layer.set_visible(cpu_mode)
+        if show_span:
+            pass  # Drawn by the span canvas above
+        elif music_is_playing:
+            # Show track progress bar on left LED
+            progress = music_info.get('progress', 0)
+            progress_layer.update(progress, lambda: create_progress_display(progress))
+        elif cpu_mode:
+            # Per-core CPU bars (loads are sampled by the scheduler)
+            cpu_loads = cpu_provider.latest
+            cpu_layer.update(cpu_provider.samples, lambda: cpu_provider.render(cpu_loads))
+        else:
+            # Show normal battery on left LED (ORIGINAL WORKING CODE)
+            charge_watts = charge_rate / 1000.0
+            discharge_watts = discharge_rate / 1000.0
+            mode = "charge" if charge_watts > 0 else "discharge" if discharge_watts > 0 else "idle"
+
+            if pulse_enabled and mode != "idle":
+                target_fade = 1.0
+            else:
+                target_fade = 0.0
+
+            state.pulse_fade += FADE_SPEED if state.pulse_fade < target_fade else -FADE_SPEED if state.pulse_fade > target_fade else 0
+            state.pulse_fade = max(0.0, min(1.0, state.pulse_fade))
+
+            full_rows, _ = gauge_fill(p / 100.0, 30)
+            top_fill = 32 - full_rows
+
+            c = None
+            if pulse_enabled and state.pulse_fade > 0:
+                if mode == "charge" and charge_watts > 0:
+                    if state.pulse_pos is None:
+                        state.pulse_pos = 33
+                    else:
+                        state.pulse_pos -= (charge_watts / STEP_SCALE) * PULSE_SPEED_MODIFIER
+                    if state.pulse_pos < top_fill:
+                        state.pulse_pos = 33
+                    c = state.pulse_pos
+                elif mode == "discharge" and discharge_watts > 0:
+                    if state.pulse_pos is None:
+                        state.pulse_pos = top_fill
+                    else:
+                        state.pulse_pos += (discharge_watts / STEP_SCALE) * PULSE_SPEED_MODIFIER
+                    if state.pulse_pos > 33:
+                        state.pulse_pos = top_fill
+                    c = state.pulse_pos
+                else:
+                    if state.pulse_pos is None:
+                        state.pulse_pos = 20
+                    state.pulse_pos += 0.5
+                    if state.pulse_pos > 30:
+                        state.pulse_pos = 10
+                    c = state.pulse_pos
+
+            battery_layer.set_columns(create_battery_frame(p, c, state.pulse_fade))
+        jobs.append((battery_device, battery_lut, config.module_sleep_timeout))
+    elif ser:
+        # Disabled display: sleep it rather than leave a stale frame up
+        battery_compositor.suspend(ser)
+
+    # Extra modules: mirror a built-in module or show their own widget
+    for device in device_pool.extras():
+        if device.role == 'cpu':
+            cpu_loads = cpu_provider.latest
+            device.layer.update(cpu_provider.samples, lambda: cpu_provider.render(cpu_loads))
+            jobs.append((device, battery_lut, config.module_sleep_timeout))
+        elif device.role == 'battery' and config.battery_enabled:
+            jobs.append((device, battery_lut, config.module_sleep_timeout))
+        elif device.role == 'time' and config.time_enabled and ser_time:
+            jobs.append((device, time_lut, config.module_sleep_timeout))
+        else:
+            device.compositor.suspend(device.serial_port)
+
+    frame_time = config.frame_time
+    if show_spectrum:
+        frame_time = min(frame_time, 1.0 / SPECTRUM_FPS)
+    # Eco scales last so it also slows the spectrum down on battery
+    frame_time /= eco_fps_scale
+
+    if state.generation is not None and not render_watchdog.current(state.generation):
+        return None  # Abandoned by the watchdog while building the frame - its replacement draws now
+    sent = device_pool.commit(jobs, frame_time)
+    if sent.get(time_device) and show_spectrum:
+        spectrum_provider.frame_shown()
+        monitor_status['spectrum_latency_ms'] = spectrum_provider.latency_ms
+    return max(0.0, frame_time - (clock.monotonic() - loop_start))
+
 def run_battery_monitoring():
     """Run battery monitoring silently until user presses Enter"""
     import threading
@@ -391,147 +4042,25 @@ def run_battery_monitoring():
     
     monitoring = True
     
-    def monitor_loop():
-        nonlocal monitoring
-        pulse_pos = None
-        pulse_fade = 0.0
-        discharge_history = []
-        SMOOTH_SAMPLES = 10
-        scroll_offset = 0
+    def monitor_loop(generation):
+        state = MonitorState(generation)
+        # The menu may have drawn on the modules since we last ran (or a previous loop died mid-frame)
+        for device in device_pool.devices:
+            device.compositor.invalidate()
         
-        while monitoring:
-            try:
-                loop_start = time.time()
-                frame_time = 1.0 / settings['fps']
-                
-                # Get battery info (cross-platform)
-                battery_data = get_battery_info()
-                if battery_data[0] is None:
-                    break
-                    
-                p, charge_rate, discharge_rate, time_remaining_minutes = battery_data
-                
-                # Use system time remaining if available, otherwise fallback to calculation
-                if time_remaining_minutes is not None:
-                    minutes_remaining = time_remaining_minutes
-                else:
-                    # Fallback to our calculation with smoothing
-                    if discharge_rate > 0:
-                        discharge_history.append(discharge_rate)
-                        if len(discharge_history) > SMOOTH_SAMPLES:
-                            discharge_history.pop(0)
-                        smooth_discharge = sum(discharge_history) / len(discharge_history)
-                        # Simple fallback calculation
-                        estimated_capacity = 50.0  # Wh
-                        remaining_wh = (p / 100.0) * estimated_capacity
-                        hours_remaining = remaining_wh / (smooth_discharge / 1000.0)
-                        minutes_remaining = max(1, min(1440, int(hours_remaining * 60)))  # 1 min to 24 hours
-                    else:
-                        minutes_remaining = None
-                
-                # Check for auto-dim
-                dim_factor = check_dim_timeout()
-                
-                # Check if music is playing (FIXED: Only when actually playing)
-                music_info = get_spotify_info()
-                music_is_playing = (music_info is not None and 
-                                  settings['music_enabled'] and
-                                  music_info.get('artist', '') != '' and
-                                  music_info.get('track', '') != '')
-                
-                # Update right LED (time or music)
-                if ser_time and settings['time_enabled']:
-                    if music_is_playing:
-                        # Show music scrolling on right LED
-                        music_matrix = create_music_display(music_info, scroll_offset)
-                        brightness_scale = (settings['time_brightness'] / 255.0) * dim_factor
-                        for col in range(TIME_WIDTH):
-                            column_data = [music_matrix[row][col] for row in range(TIME_HEIGHT)]
-                            send_column(col, column_data, ser_time, brightness_scale)
-                        send_flush(ser_time)
-                        # Update scroll for music
-                        scroll_offset += settings['music_scroll_speed']
-                        if scroll_offset > len(f"{music_info['artist']} - {music_info['track']}") * 6:
-                            scroll_offset = -TIME_HEIGHT
-                    else:
-                        # Show normal time on right LED
-                        time_matrix = create_time_display(minutes_remaining)
-                        brightness_scale = (settings['time_brightness'] / 255.0) * dim_factor
-                        for col in range(TIME_WIDTH):
-                            column_data = [time_matrix[row][col] for row in range(TIME_HEIGHT)]
-                            send_column(col, column_data, ser_time, brightness_scale)
-                        send_flush(ser_time)
-                
-                # Update left LED (battery or progress)
-                if ser and settings['battery_enabled']:
-                    if music_is_playing:
-                        # Show track progress bar on left LED
-                        progress = music_info.get('progress', 0)
-                        progress_columns = create_progress_display(progress)
-                        brightness_scale = (settings['battery_brightness'] / 255.0) * dim_factor
-                        for col in range(WIDTH):
-                            send_column(col, progress_columns[col], ser, brightness_scale)
-                        send_flush(ser)
-                    else:
-                        # Show normal battery on left LED (ORIGINAL WORKING CODE)
-                        charge_watts = charge_rate / 1000.0
-                        discharge_watts = discharge_rate / 1000.0
-                        mode = "charge" if charge_watts > 0 else "discharge" if discharge_watts > 0 else "idle"
-                        
-                        if settings['pulse_enabled'] and mode != "idle":
-                            target_fade = 1.0
-                        else:
-                            target_fade = 0.0
-                            
-                        pulse_fade += FADE_SPEED if pulse_fade < target_fade else -FADE_SPEED if pulse_fade > target_fade else 0
-                        pulse_fade = max(0.0, min(1.0, pulse_fade))
-
-                        fill_level = (p / 100.0) * 30
-                        full_rows = math.floor(fill_level)
-                        top_fill = 32 - full_rows
-
-                        c = None
-                        if settings['pulse_enabled'] and pulse_fade > 0:
-                            if mode == "charge" and charge_watts > 0:
-                                if pulse_pos is None:
-                                    pulse_pos = 33
-                                else:
-                                    pulse_pos -= (charge_watts / STEP_SCALE) * PULSE_SPEED_MODIFIER
-                                if pulse_pos < top_fill:
-                                    pulse_pos = 33
-                                c = pulse_pos
-                            elif mode == "discharge" and discharge_watts > 0:
-                                if pulse_pos is None:
-                                    pulse_pos = top_fill
-                                else:
-                                    pulse_pos += (discharge_watts / STEP_SCALE) * PULSE_SPEED_MODIFIER
-                                if pulse_pos > 33:
-                                    pulse_pos = top_fill
-                                c = pulse_pos
-                            else:
-                                if pulse_pos is None:
-                                    pulse_pos = 20
-                                pulse_pos += 0.5
-                                if pulse_pos > 30:
-                                    pulse_pos = 10
-                                c = pulse_pos
-
-                        columns = create_battery_frame(p, c, pulse_fade)
-                        brightness_scale = (settings['battery_brightness'] / 255.0) * dim_factor
-                        for col in range(WIDTH):
-                            send_column(col, columns[col], ser, brightness_scale)
-                        send_flush(ser)
-
-                elapsed = time.time() - loop_start
-                if elapsed < frame_time:
-                    time.sleep(frame_time - elapsed)
-                    
-            except Exception:
-                break  # Silent error handling
+        while monitoring and render_watchdog.current(generation):
+            delay = monitor_frame(state)
+            if delay is None:
+                break
+            render_watchdog.beat(delay)
+            clock.sleep(delay)
     
-    # Start monitoring in background thread
-    monitor_thread = threading.Thread(target=monitor_loop, daemon=True)
-    monitor_thread.start()
+    # Sensors are sampled on their own schedule, off the render thread
+    provider_scheduler.start()
+    
+    # Start monitoring in background thread, restarted by the watchdog if it crashes or hangs
+    monitor_status['running'] = True
+    render_watchdog.start(monitor_loop)
     
     # Wait for user to press Enter
     try:
@@ -541,13 +4070,138 @@ def run_battery_monitoring():
     
     # Stop monitoring
     monitoring = False
+    render_watchdog.stop()
+    monitor_status['running'] = False
+    state_publisher.publish(monitor_status)
+    provider_scheduler.stop()
+
+class SimulatedBattery:
+    """Battery that drains (or charges) at a fixed wattage on `clock` time
+
+    read() stands in for get_battery_info() and feeds the same streaming
+    estimator, so time remaining, pulse speed and the gauge all behave as they
+    would on a real discharge - just as fast as the clock runs.
+    """
+
+    def __init__(self, percent=100.0, capacity_wh=80.0, discharge_watts=12.0, charge_watts=0.0):
+        self.capacity_wh = capacity_wh
+        self.energy_wh = capacity_wh * percent / 100.0
+        self.discharge_watts = discharge_watts
+        self.charge_watts = charge_watts
+        self.last_read = None
+
+    @property
+    def percent(self):
+        return self.energy_wh / self.capacity_wh * 100.0
+
+    def read(self):
+        now = clock.time()
+        if self.last_read is not None:
+            hours = (now - self.last_read) / 3600.0
+            self.energy_wh += (self.charge_watts - self.discharge_watts) * hours
+            self.energy_wh = max(0.0, min(self.capacity_wh, self.energy_wh))
+        self.last_read = now
+
+        if self.charge_watts > 0 and self.energy_wh < self.capacity_wh:
+            status, watts = "Charging", self.charge_watts
+        elif self.charge_watts <= 0 and self.discharge_watts > 0 and self.energy_wh > 0:
+            status, watts = "Discharging", self.discharge_watts
+        else:
+            status, watts = "Full" if self.energy_wh >= self.capacity_wh else "Not charging", 0.0
+        battery_estimator.update(watts, self.energy_wh, self.capacity_wh, status, now)
+        charge_rate = watts * 1000 if status == "Charging" else 0
+        discharge_rate = watts * 1000 if status == "Discharging" else 0
+        return self.percent, charge_rate, discharge_rate, battery_estimator.time_to_empty()
+
+class SimulatedPlayer:
+    """Plays a list of (artist, track, seconds[, art url]) tracks back to back on `clock` time"""
+
+    def __init__(self, tracks, start=None):
+        self.tracks = tracks
+        self.start = start
+
+    def read(self):
+        """Same shape as get_spotify_info(): None once the list has played out"""
+        now = clock.time()
+        if self.start is None:
+            self.start = now
+        elapsed = now - self.start
+        for artist, track, seconds, *art_url in self.tracks:
+            if elapsed < seconds:
+                return {
+                    'status': 'playing',
+                    'artist': artist,
+                    'track': track,
+                    'progress': min(100, int(elapsed / seconds * 100)),
+                    'art_url': art_url[0] if art_url else '',
+                }
+            elapsed -= seconds
+        return None
+
+def run_simulation(duration, battery=None, player=None, speed=None):
+    """Run the render loop for `duration` simulated seconds; returns a summary dict
+
+    Time comes from a SimulatedClock and the battery/music from simulated
+    sources; frames go to whatever modules are open (EmulatedModules with
+    --emulate). Timed providers are sampled inline on the same clock, event
+    providers (notifications, logind, audio capture) and eco mode stay off,
+    so a run is deterministic for the same settings.
+    """
+    global clock, last_activity_time
+
+    battery = battery or SimulatedBattery()
+    saved = (clock, last_activity_time, battery_provider.source, spotify_provider.source, eco_provider.enabled)
+    clock = SimulatedClock(speed=speed)
+    last_activity_time = clock.time()
+    battery_provider.source = battery.read
+    spotify_provider.source = player.read if player is not None else (lambda: None)
+    eco_provider.enabled = False
+    battery_estimator.reset()
+    for device in device_pool.devices:
+        device.compositor.invalidate()
+
+    stats = {'frames': 0, 'dimmed_frames': 0, 'first_dim_at': None, 'music_frames': 0,
+             'minutes_remaining': [], 'stopped_early': False}
+    bytes_before = sum(device.compositor.bytes_sent for device in device_pool.devices)
+    sleeps_before = sum(module_power[device.serial_port].sleeps for device in device_pool.devices)
+    real_start = time.monotonic()
+    state = MonitorState()
+    provider_scheduler.start(threaded=False)
+    try:
+        while clock.monotonic() < duration:
+            provider_scheduler.run_due()
+            delay = monitor_frame(state)
+            if delay is None:
+                stats['stopped_early'] = True
+                break
+            stats['frames'] += 1
+            if check_dim_timeout() < 1.0:
+                stats['dimmed_frames'] += 1
+                if stats['first_dim_at'] is None:
+                    stats['first_dim_at'] = clock.monotonic()
+            if monitor_status.get('music'):
+                stats['music_frames'] += 1
+            minutes = monitor_status.get('minutes_remaining')
+            if not stats['minutes_remaining'] or stats['minutes_remaining'][-1][1] != minutes:
+                stats['minutes_remaining'].append((round(clock.monotonic(), 1), minutes))
+            clock.sleep(delay)
+    finally:
+        provider_scheduler.stop()
+        simulated = clock.monotonic()
+        clock, last_activity_time, battery_provider.source, spotify_provider.source, eco_provider.enabled = saved
+        battery_estimator.reset()
+
+    stats['simulated_seconds'] = simulated
+    stats['real_seconds'] = time.monotonic() - real_start
+    stats['battery_percent'] = battery.percent
+    stats['bytes_sent'] = sum(device.compositor.bytes_sent for device in device_pool.devices) - bytes_before
+    stats['module_sleeps'] = sum(module_power[device.serial_port].sleeps for device in device_pool.devices) - sleeps_before
+    return stats
 
 def create_progress_display(progress_percentage):
     """Create track progress display matrix - shows song progress as a vertical bar WITHOUT borders"""
     columns = []
-    fill_level = (progress_percentage / 100.0) * 30  # 30 rows (2 to 32) for 0-100%
-    full_rows = math.floor(fill_level)
-    partial_fraction = fill_level - full_rows
+    full_rows, partial_fraction = gauge_fill(progress_percentage / 100.0, 30)  # 30 rows (2 to 32) for 0-100%
     partial_row = 32 - full_rows if full_rows < 30 else None
 
     for col in range(WIDTH):
@@ -563,7 +4217,7 @@ def create_progress_display(progress_percentage):
                     if col == 4:
                         fade_factor = min(1.0, partial_fraction / 0.33)
                     elif col in (3, 5):
-                        fade_factor = max(0.0, (partial_fraction - 0.33) / 0.33)
+                        fade_factor = min(1.0, max(0.0, (partial_fraction - 0.33) / 0.33))
                     elif col in (2, 6):
                         fade_factor = max(0.0, (partial_fraction - 0.66) / 0.34)
                     column[row] = int(round(MAX_BRIGHT * fade_factor))
@@ -574,6 +4228,195 @@ def create_progress_display(progress_percentage):
 
     return columns
 
+MAX_CPU_BARS = 16
+
+def create_cpu_display(loads):
+    """Per-core load as vertical bars (columns layout, like create_progress_display)
+
+    Up to 9 cores get one bar each across the full height; 10-16 cores are
+    split into a top and bottom bank; more than 16 are averaged into 16 bars.
+    """
+    columns = [[0] * HEIGHT for _ in range(WIDTH)]
+    if not loads:
+        return columns
+
+    if len(loads) > MAX_CPU_BARS:
+        group = len(loads) / MAX_CPU_BARS
+        loads = [sum(loads[int(i * group):int((i + 1) * group)]) / (int((i + 1) * group) - int(i * group))
+                 for i in range(MAX_CPU_BARS)]
+
+    if len(loads) <= WIDTH:
+        banks = [(loads, 0, HEIGHT - 1)]
+    else:
+        half = (len(loads) + 1) // 2
+        banks = [(loads[:half], 0, HEIGHT // 2 - 2), (loads[half:], HEIGHT // 2 + 1, HEIGHT - 1)]
+
+    for bank, top, bottom in banks:
+        count = len(bank)
+        # Leave a one-column gap between bars when there is room for it
+        gap = 1 if count * 2 - 1 <= WIDTH else 0
+        bar_width = max(1, (WIDTH - gap * (count - 1)) // count)
+        start_col = (WIDTH - (bar_width * count + gap * (count - 1))) // 2
+        rows = bottom - top + 1
+        for i, load in enumerate(bank):
+            full_rows, partial_fraction = gauge_fill(load, rows)
+            first_col = start_col + i * (bar_width + gap)
+            for col in range(first_col, first_col + bar_width):
+                column = columns[col]
+                for row in range(bottom - full_rows + 1, bottom + 1):
+                    column[row] = MAX_BRIGHT
+                if full_rows < rows:
+                    column[bottom - full_rows] = int(round(MAX_BRIGHT * partial_fraction))
+
+    return columns
+
+# Simple 3x5 font for scrolling text (same as time display)
+FONT_3X5 = {
+    'A': [[1,1,1],[1,0,1],[1,1,1],[1,0,1],[1,0,1]],
+    'B': [[1,1,0],[1,0,1],[1,1,0],[1,0,1],[1,1,0]],
+    'C': [[1,1,1],[1,0,0],[1,0,0],[1,0,0],[1,1,1]],
+    'D': [[1,1,0],[1,0,1],[1,0,1],[1,0,1],[1,1,0]],
+    'E': [[1,1,1],[1,0,0],[1,1,0],[1,0,0],[1,1,1]],
+    'F': [[1,1,1],[1,0,0],[1,1,0],[1,0,0],[1,0,0]],
+    'G': [[1,1,1],[1,0,0],[1,0,1],[1,0,1],[1,1,1]],
+    'H': [[1,0,1],[1,0,1],[1,1,1],[1,0,1],[1,0,1]],
+    'I': [[1,1,1],[0,1,0],[0,1,0],[0,1,0],[1,1,1]],
+    'J': [[1,1,1],[0,0,1],[0,0,1],[1,0,1],[1,1,1]],
+    'K': [[1,0,1],[1,1,0],[1,0,0],[1,1,0],[1,0,1]],
+    'L': [[1,0,0],[1,0,0],[1,0,0],[1,0,0],[1,1,1]],
+    'M': [[1,0,1],[1,1,1],[1,1,1],[1,0,1],[1,0,1]],
+    'N': [[1,0,1],[1,1,1],[1,1,1],[1,0,1],[1,0,1]],
+    'O': [[1,1,1],[1,0,1],[1,0,1],[1,0,1],[1,1,1]],
+    'P': [[1,1,1],[1,0,1],[1,1,1],[1,0,0],[1,0,0]],
+    'Q': [[1,1,1],[1,0,1],[1,0,1],[1,1,1],[0,0,1]],
+    'R': [[1,1,1],[1,0,1],[1,1,0],[1,0,1],[1,0,1]],
+    'S': [[1,1,1],[1,0,0],[1,1,1],[0,0,1],[1,1,1]],
+    'T': [[1,1,1],[0,1,0],[0,1,0],[0,1,0],[0,1,0]],
+    'U': [[1,0,1],[1,0,1],[1,0,1],[1,0,1],[1,1,1]],
+    'V': [[1,0,1],[1,0,1],[1,0,1],[1,0,1],[0,1,0]],
+    'W': [[1,0,1],[1,0,1],[1,1,1],[1,1,1],[1,0,1]],
+    'X': [[1,0,1],[0,1,0],[0,1,0],[0,1,0],[1,0,1]],
+    'Y': [[1,0,1],[1,0,1],[0,1,0],[0,1,0],[0,1,0]],
+    'Z': [[1,1,1],[0,0,1],[0,1,0],[1,0,0],[1,1,1]],
+    '0': [[1,1,1],[1,0,1],[1,0,1],[1,0,1],[1,1,1]],
+    '1': [[0,1,0],[1,1,0],[0,1,0],[0,1,0],[1,1,1]],
+    '2': [[1,1,1],[0,0,1],[1,1,1],[1,0,0],[1,1,1]],
+    '3': [[1,1,1],[0,0,1],[1,1,1],[0,0,1],[1,1,1]],
+    '4': [[1,0,1],[1,0,1],[1,1,1],[0,0,1],[0,0,1]],
+    '5': [[1,1,1],[1,0,0],[1,1,1],[0,0,1],[1,1,1]],
+    '6': [[1,1,1],[1,0,0],[1,1,1],[1,0,1],[1,1,1]],
+    '7': [[1,1,1],[0,0,1],[0,0,1],[0,1,0],[1,0,0]],
+    '8': [[1,1,1],[1,0,1],[1,1,1],[1,0,1],[1,1,1]],
+    '9': [[1,1,1],[1,0,1],[1,1,1],[0,0,1],[1,1,1]],
+    ' ': [[0,0,0],[0,0,0],[0,0,0],[0,0,0],[0,0,0]],
+    '-': [[0,0,0],[0,0,0],[1,1,1],[0,0,0],[0,0,0]],
+    '.': [[0,0,0],[0,0,0],[0,0,0],[0,0,0],[0,1,0]],
+    ',': [[0,0,0],[0,0,0],[0,0,0],[0,1,0],[1,0,0]],
+    '!': [[0,1,0],[0,1,0],[0,1,0],[0,0,0],[0,1,0]],
+    '?': [[1,1,1],[0,0,1],[0,1,0],[0,0,0],[0,1,0]],
+    "'": [[0,1,0],[0,1,0],[0,0,0],[0,0,0],[0,0,0]],
+    ':': [[0,0,0],[0,1,0],[0,0,0],[0,1,0],[0,0,0]],
+    '/': [[0,0,1],[0,0,1],[0,1,0],[1,0,0],[1,0,0]],
+    '(': [[0,0,1],[0,1,0],[0,1,0],[0,1,0],[0,0,1]],
+    ')': [[1,0,0],[0,1,0],[0,1,0],[0,1,0],[1,0,0]],
+    '+': [[0,0,0],[0,1,0],[1,1,1],[0,1,0],[0,0,0]],
+}
+
+# Shown for characters we can't map to anything in the font
+FALLBACK_GLYPH = [[1,1,1],[1,1,1],[1,1,1],[1,1,1],[1,1,1]]
+
+# Letters that don't decompose to ASCII (checked after uppercasing)
+TRANSLITERATIONS = {
+    'Æ': 'AE', 'Ø': 'O', 'Œ': 'OE', 'Ł': 'L', 'Đ': 'D', 'Ð': 'D', 'Þ': 'TH', 'Ħ': 'H', 'ẞ': 'SS',
+    'İ': 'I', 'ı': 'I', '&': '+', '"': "'", '‘': "'", '’': "'", '“': "'", '”': "'", '`': "'",
+    '–': '-', '—': '-', '‐': '-', '…': '...', '·': '.', '¡': '!', '¿': '?', ';': ',',
+    '[': '(', ']': ')', '{': '(', '}': ')', '\\': '/', '_': '-', '~': '-', '#': '+',
+    'ー': '-', '・': ' ', '、': ',', '。': '.', '「': "'", '」': "'", '！': '!', '？': '?',
+    # Cyrillic
+    'А': 'A', 'Б': 'B', 'В': 'V', 'Г': 'G', 'Д': 'D', 'Е': 'E', 'Ё': 'E', 'Ж': 'ZH', 'З': 'Z',
+    'И': 'I', 'Й': 'Y', 'К': 'K', 'Л': 'L', 'М': 'M', 'Н': 'N', 'О': 'O', 'П': 'P', 'Р': 'R',
+    'С': 'S', 'Т': 'T', 'У': 'U', 'Ф': 'F', 'Х': 'KH', 'Ц': 'TS', 'Ч': 'CH', 'Ш': 'SH', 'Щ': 'SHCH',
+    'Ъ': '', 'Ы': 'Y', 'Ь': '', 'Э': 'E', 'Ю': 'YU', 'Я': 'YA', 'Є': 'YE', 'І': 'I', 'Ї': 'YI',
+    # Greek
+    'Α': 'A', 'Β': 'V', 'Γ': 'G', 'Δ': 'D', 'Ε': 'E', 'Ζ': 'Z', 'Η': 'I', 'Θ': 'TH', 'Ι': 'I',
+    'Κ': 'K', 'Λ': 'L', 'Μ': 'M', 'Ν': 'N', 'Ξ': 'X', 'Ο': 'O', 'Π': 'P', 'Ρ': 'R', 'Σ': 'S',
+    'Τ': 'T', 'Υ': 'Y', 'Φ': 'F', 'Χ': 'CH', 'Ψ': 'PS', 'Ω': 'O',
+}
+
+def _in_font(text):
+    return all(c in FONT_3X5 for c in text)
+
+def _transliterate(char):
+    """Best ASCII spelling of one character using only glyphs in FONT_3X5, or None"""
+    import unicodedata
+
+    upper = char.upper()
+    if _in_font(upper):
+        return upper
+    if upper in TRANSLITERATIONS:
+        return TRANSLITERATIONS[upper]
+    # Accents, full-width forms, ligatures: Ö -> O, Ａ -> A, ﬁ -> FI
+    stripped = ''.join(c for c in unicodedata.normalize('NFKD', char) if not unicodedata.combining(c)).upper()
+    if stripped and stripped != upper:
+        spelled = ''.join(TRANSLITERATIONS.get(c, c) for c in stripped)
+        if _in_font(spelled):
+            return spelled
+    # Kana carry their romanisation in the character name: "KATAKANA LETTER KA"
+    name = unicodedata.name(char, '')
+    if name.startswith(('HIRAGANA LETTER', 'KATAKANA LETTER')):
+        return name.rsplit(' ', 1)[-1]
+    if char.isspace():
+        return ' '
+    if unicodedata.category(char) in ('Mn', 'Me', 'Cf', 'Cc'):
+        return ''  # combining marks, zero-width joiners, control characters
+    return None
+
+@functools.lru_cache(maxsize=1024)
+def char_glyphs(char):
+    """Glyphs for one character: transliterated to the 3x5 font, box if unmappable
+
+    Cached per character so new track names only pay for unicodedata lookups
+    the first time a character is seen.
+    """
+    spelled = _transliterate(char)
+    if spelled is None:
+        return (FALLBACK_GLYPH,)
+    return tuple(FONT_3X5[c] for c in spelled)
+
+def text_glyphs(text):
+    """All glyphs for a string, in display order"""
+    return [glyph for char in text for glyph in char_glyphs(char)]
+
+def music_text_height(music_info):
+    """Rows needed to scroll the whole "Artist - Track" string past"""
+    return len(text_glyphs(f"{music_info['artist']} - {music_info['track']}")) * 6
+
+SPAN_GLYPH_ADVANCE = 4  # 3 columns + 1 space when text runs horizontally
+
+def span_text_width(music_info):
+    """Columns taken by "Artist - Track" written left to right"""
+    return len(text_glyphs(f"{music_info['artist']} - {music_info['track']}")) * SPAN_GLYPH_ADVANCE
+
+def create_span_display(canvas, music_info, scroll_offset=0):
+    """Artist/title scrolling right to left across both modules, track progress along the bottom"""
+    canvas.clear()
+    glyphs = text_glyphs(f"{music_info['artist']} - {music_info['track']}")
+    top = (canvas.height - 5) // 2
+    x = canvas.width - scroll_offset  # Text enters from the right edge
+    for pattern in glyphs:
+        if x >= canvas.width:
+            break
+        if x > -3:
+            for row_idx, pattern_row in enumerate(pattern):
+                for col_idx, pixel in enumerate(pattern_row):
+                    if pixel:
+                        canvas.set(x + col_idx, top + row_idx)
+        x += SPAN_GLYPH_ADVANCE
+
+    # Progress bar over the full canvas width (gap included, so it moves at an even pace)
+    filled = int(round(canvas.width * max(0.0, min(100.0, music_info.get('progress', 0))) / 100.0))
+    canvas.fill_rect(0, canvas.height - 3, filled, 2)
+
 def create_music_display(music_info, scroll_offset=0):
     """Create music display matrix with scrolling text vertically"""
     matrix = [[0 for _ in range(TIME_WIDTH)] for _ in range(TIME_HEIGHT)]
@@ -604,53 +4447,11 @@ def create_music_display(music_info, scroll_offset=0):
         return matrix
     
     # Display format: "Artist - Track" scrolling vertically
-    display_text = f"{music_info['artist']} - {music_info['track']}"
-    
-    # Simple 3x5 font for scrolling text (same as time display)
-    font = {
-        'A': [[1,1,1],[1,0,1],[1,1,1],[1,0,1],[1,0,1]],
-        'B': [[1,1,0],[1,0,1],[1,1,0],[1,0,1],[1,1,0]],
-        'C': [[1,1,1],[1,0,0],[1,0,0],[1,0,0],[1,1,1]],
-        'D': [[1,1,0],[1,0,1],[1,0,1],[1,0,1],[1,1,0]],
-        'E': [[1,1,1],[1,0,0],[1,1,0],[1,0,0],[1,1,1]],
-        'F': [[1,1,1],[1,0,0],[1,1,0],[1,0,0],[1,0,0]],
-        'G': [[1,1,1],[1,0,0],[1,0,1],[1,0,1],[1,1,1]],
-        'H': [[1,0,1],[1,0,1],[1,1,1],[1,0,1],[1,0,1]],
-        'I': [[1,1,1],[0,1,0],[0,1,0],[0,1,0],[1,1,1]],
-        'J': [[1,1,1],[0,0,1],[0,0,1],[1,0,1],[1,1,1]],
-        'K': [[1,0,1],[1,1,0],[1,0,0],[1,1,0],[1,0,1]],
-        'L': [[1,0,0],[1,0,0],[1,0,0],[1,0,0],[1,1,1]],
-        'M': [[1,0,1],[1,1,1],[1,1,1],[1,0,1],[1,0,1]],
-        'N': [[1,0,1],[1,1,1],[1,1,1],[1,0,1],[1,0,1]],
-        'O': [[1,1,1],[1,0,1],[1,0,1],[1,0,1],[1,1,1]],
-        'P': [[1,1,1],[1,0,1],[1,1,1],[1,0,0],[1,0,0]],
-        'Q': [[1,1,1],[1,0,1],[1,0,1],[1,1,1],[0,0,1]],
-        'R': [[1,1,1],[1,0,1],[1,1,0],[1,0,1],[1,0,1]],
-        'S': [[1,1,1],[1,0,0],[1,1,1],[0,0,1],[1,1,1]],
-        'T': [[1,1,1],[0,1,0],[0,1,0],[0,1,0],[0,1,0]],
-        'U': [[1,0,1],[1,0,1],[1,0,1],[1,0,1],[1,1,1]],
-        'V': [[1,0,1],[1,0,1],[1,0,1],[1,0,1],[0,1,0]],
-        'W': [[1,0,1],[1,0,1],[1,1,1],[1,1,1],[1,0,1]],
-        'X': [[1,0,1],[0,1,0],[0,1,0],[0,1,0],[1,0,1]],
-        'Y': [[1,0,1],[1,0,1],[0,1,0],[0,1,0],[0,1,0]],
-        'Z': [[1,1,1],[0,0,1],[0,1,0],[1,0,0],[1,1,1]],
-        '0': [[1,1,1],[1,0,1],[1,0,1],[1,0,1],[1,1,1]],
-        '1': [[0,1,0],[1,1,0],[0,1,0],[0,1,0],[1,1,1]],
-        '2': [[1,1,1],[0,0,1],[1,1,1],[1,0,0],[1,1,1]],
-        '3': [[1,1,1],[0,0,1],[1,1,1],[0,0,1],[1,1,1]],
-        '4': [[1,0,1],[1,0,1],[1,1,1],[0,0,1],[0,0,1]],
-        '5': [[1,1,1],[1,0,0],[1,1,1],[0,0,1],[1,1,1]],
-        '6': [[1,1,1],[1,0,0],[1,1,1],[1,0,1],[1,1,1]],
-        '7': [[1,1,1],[0,0,1],[0,0,1],[0,1,0],[1,0,0]],
-        '8': [[1,1,1],[1,0,1],[1,1,1],[1,0,1],[1,1,1]],
-        '9': [[1,1,1],[1,0,1],[1,1,1],[0,0,1],[1,1,1]],
-        ' ': [[0,0,0],[0,0,0],[0,0,0],[0,0,0],[0,0,0]],
-        '-': [[0,0,0],[0,0,0],[1,1,1],[0,0,0],[0,0,0]],
-        '.': [[0,0,0],[0,0,0],[0,0,0],[0,0,0],[0,1,0]],
-        ',': [[0,0,0],[0,0,0],[0,0,0],[0,1,0],[1,0,0]],
-        '!': [[0,1,0],[0,1,0],[0,1,0],[0,0,0],[0,1,0]],
-        '?': [[1,1,1],[0,0,1],[0,1,0],[0,0,0],[0,1,0]]
-    }
+    return create_text_display(f"{music_info['artist']} - {music_info['track']}", scroll_offset)
+
+def create_text_display(display_text, scroll_offset=0):
+    """Scroll any text vertically through a module with the 3x5 font (music, notifications)"""
+    matrix = [[0 for _ in range(TIME_WIDTH)] for _ in range(TIME_HEIGHT)]
     
     # Render scrolling text vertically (like time display)
     start_col = 3  # Center in columns 3,4,5
@@ -658,17 +4459,17 @@ def create_music_display(music_info, scroll_offset=0):
     # Apply scroll offset vertically
     row_offset = -scroll_offset
     
-    for char in display_text.upper():
-        if char in font and row_offset < TIME_HEIGHT:
-            pattern = font[char]
-            for row_idx, pattern_row in enumerate(pattern):
-                display_row = row_offset + row_idx
-                if 0 <= display_row < TIME_HEIGHT:
-                    for col_idx, pixel in enumerate(pattern_row):
-                        display_col = start_col + col_idx
-                        if pixel and display_col < TIME_WIDTH:
-                            matrix[display_row][display_col] = MAX_BRIGHT
-            row_offset += 6  # Move down for next character (5 rows + 1 space)
+    for pattern in text_glyphs(display_text):
+        if row_offset >= TIME_HEIGHT:
+            break
+        for row_idx, pattern_row in enumerate(pattern):
+            display_row = row_offset + row_idx
+            if 0 <= display_row < TIME_HEIGHT:
+                for col_idx, pixel in enumerate(pattern_row):
+                    display_col = start_col + col_idx
+                    if pixel and display_col < TIME_WIDTH:
+                        matrix[display_row][display_col] = MAX_BRIGHT
+        row_offset += 6  # Move down for next character (5 rows + 1 space)
     
     return matrix
 
@@ -689,13 +4490,22 @@ def show_battery_status():
     print(f"Charge Rate: {charge_rate:.0f}mW")
     print(f"Discharge Rate: {discharge_rate:.0f}mW")
     
+    time_to_full = battery_estimator.time_to_full()
     if time_remaining_minutes is not None:
         hours = time_remaining_minutes // 60
         mins = time_remaining_minutes % 60
         print(f"Time Remaining: {hours:02d}:{mins:02d}")
-        print("Source: System (upower)")
+    elif time_to_full is not None:
+        print(f"Time to Full: {time_to_full // 60:02d}:{time_to_full % 60:02d}")
     else:
         print("Time Remaining: Unknown")
+    
+    if battery_estimator.has_capacity:
+        print(f"Energy: {battery_estimator.energy_now_wh:.1f} / {battery_estimator.energy_full_wh:.1f} Wh")
+        print("Source: sysfs (smoothed)")
+    elif time_remaining_minutes is not None:
+        print("Source: System (upower)")
+    else:
         print("Source: Not available")
     
     if charge_rate > 0:
@@ -710,14 +4520,13 @@ def show_battery_status():
 
 def brightness_menu(display_type):
     """Brightness settings menu"""
-    global last_activity_time
     display_name = "Battery (Left LED)" if display_type == "battery" else "Time (Right LED)"
     setting_key = f"{display_type}_brightness"
     startup_key = f"startup_{display_type}_brightness"
     
     while True:
         # Update activity time when in brightness menu
-        last_activity_time = time.time()
+        register_activity()
         
         clear_screen()
         current_val = settings[setting_key]
@@ -754,7 +4563,7 @@ def brightness_menu(display_type):
         choice = input("Select option: ").strip()
         
         # Update activity time on any input
-        last_activity_time = time.time()
+        register_activity()
         
         if choice == '0':
             break
@@ -785,7 +4594,7 @@ def brightness_menu(display_type):
         elif choice == '5':
             try:
                 val = int(input(f"Enter current brightness (0-255): "))
-                last_activity_time = time.time()  # Update activity after input
+                register_activity()  # Update activity after input
                 settings[setting_key] = max(0, min(255, val))
                 print(f"Setting {display_name} current brightness to {settings[setting_key]}...")
                 apply_brightness_immediately(display_type)
@@ -822,7 +4631,7 @@ def brightness_menu(display_type):
         elif choice == '10':
             try:
                 val = int(input(f"Enter startup default brightness (0-255): "))
-                last_activity_time = time.time()  # Update activity after input
+                register_activity()  # Update activity after input
                 settings[startup_key] = max(0, min(255, val))
                 save_settings()
                 percentage = int((settings[startup_key] / 255) * 100)
@@ -850,10 +4659,7 @@ def flash_test(display_type):
         print(f"Flashing {display_name} LED...")
         for i in range(3):
             # Full brightness
-            columns = create_battery_frame(100, None, 0)
-            for col in range(WIDTH):
-                send_column(col, columns[col], ser, 1.0)
-            send_flush(ser)
+            show_frame(ser, create_battery_frame(100, None, 0))
             time.sleep(0.3)
             
             # Off
@@ -868,11 +4674,7 @@ def flash_test(display_type):
         print(f"Flashing {display_name} LED...")
         for i in range(3):
             # Full brightness
-            test_matrix = create_time_display(5328)  # 88:48
-            for col in range(TIME_WIDTH):
-                column_data = [test_matrix[row][col] for row in range(TIME_HEIGHT)]
-                send_column(col, column_data, ser_time, 1.0)
-            send_flush(ser_time)
+            show_frame(ser_time, matrix_to_columns(create_time_display(5328)))  # 88:48
             time.sleep(0.3)
             
             # Off
@@ -888,55 +4690,61 @@ def flash_test(display_type):
     
     input("Press Enter to continue...")
 
-def apply_brightness_immediately(display_type):
-    """Apply brightness change to display immediately"""
+def apply_brightness_immediately(display_type, cached=False):
+    """Apply brightness change to display immediately
+
+    cached=True (callers off the menu thread, e.g. the control socket) draws
+    from the battery provider's last reading instead of running upower, and
+    logs errors instead of printing over the menu.
+    """
+    publish_render_config()
     try:
         # Check for auto-dim factor
         dim_factor = check_dim_timeout()
         
-        if display_type == "battery" and ser and settings['battery_enabled']:
+        if monitor_status['running']:
+            # Re-send what the modules show with the new brightness, ahead of the next render
+            config = render_config
+            dimmed = dim_factor < 1.0
+            if display_type == "battery":
+                lut, roles = config.battery_dim_lut if dimmed else config.battery_lut, ('battery', 'cpu')
+            else:
+                lut, roles = config.time_dim_lut if dimmed else config.time_lut, ('time',)
+            for device in device_pool.devices:
+                if device.role in roles:
+                    channel_for(device.serial_port).set_brightness(lut)
+            
+        elif display_type == "battery" and ser and settings['battery_enabled']:
             # Get current battery info for battery display
-            battery_data = get_battery_info()
-            if battery_data[0] is None:
+            battery_data = battery_provider.latest if cached else get_battery_info()
+            if battery_data is None or battery_data[0] is None:
                 return
             p, charge_rate, discharge_rate, time_remaining_minutes = battery_data
             
             # Update battery display with new brightness (including auto-dim)
             columns = create_battery_frame(p, None, 0)  # No pulse for immediate update
             brightness_scale = (settings['battery_brightness'] / 255.0) * dim_factor
-            for col in range(WIDTH):
-                send_column(col, columns[col], ser, brightness_scale)
-            send_flush(ser)
+            show_frame(ser, columns, brightness_scale)
             
         elif display_type == "time" and ser_time and settings['time_enabled']:
             # Get current battery info for time calculation
-            battery_data = get_battery_info()
-            if battery_data[0] is None:
+            battery_data = battery_provider.latest if cached else get_battery_info()
+            if battery_data is None or battery_data[0] is None:
                 # If no battery data, show test pattern
                 test_matrix = create_time_display(5328)  # 88:48
             else:
                 p, charge_rate, discharge_rate, time_remaining_minutes = battery_data
-                
-                # Calculate time remaining
-                minutes_remaining = time_remaining_minutes
-                if minutes_remaining is None and discharge_rate > 0:
-                    # Simple fallback calculation
-                    estimated_capacity = 50.0
-                    remaining_wh = (p / 100.0) * estimated_capacity
-                    hours_remaining = remaining_wh / (discharge_rate / 1000.0)
-                    minutes_remaining = max(1, min(1440, int(hours_remaining * 60)))
-                
-                test_matrix = create_time_display(minutes_remaining)
+                test_matrix = create_time_display(time_remaining_minutes)
             
             # Update time display with new brightness (including auto-dim)
             brightness_scale = (settings['time_brightness'] / 255.0) * dim_factor
-            for col in range(TIME_WIDTH):
-                column_data = [test_matrix[row][col] for row in range(TIME_HEIGHT)]
-                send_column(col, column_data, ser_time, brightness_scale)
-            send_flush(ser_time)
+            show_frame(ser_time, matrix_to_columns(test_matrix), brightness_scale)
             
     except Exception as e:
-        print(f"Error applying brightness: {e}")
+        if cached:
+            log('warning', f"Error applying brightness: {e}", key='brightness')
+        else:
+            print(f"Error applying brightness: {e}")
 
 def display_settings_menu():
     """Display settings menu"""
@@ -957,6 +4765,13 @@ def display_settings_menu():
         
         print("5. Disable Auto-Dim Completely")
         print("6. Fix Time Display (if showing square)")
+        print(f"7. Left LED Mode: {'CPU LOAD' if settings['left_mode'] == 'cpu' else 'BATTERY'}")
+        sleep_status = "NEVER" if settings['module_sleep_timeout'] == 0 else f"after {settings['module_sleep_timeout']}s blank/unchanged"
+        print(f"8. Module Sleep: {sleep_status}")
+        eco_status = f"ON (budget {settings['eco_cpu_budget']}% CPU on battery)" if settings['eco_mode'] else "OFF"
+        print(f"9. Eco Mode: {eco_status}")
+        print(f"10. Desktop Notifications: {'ON' if settings['notifications_enabled'] else 'OFF'}")
+        print(f"11. Mode Transitions: {settings['transition'].upper()}")
         print("0. Back to main menu")
         print("="*50)
         
@@ -988,6 +4803,53 @@ def display_settings_menu():
             time.sleep(1)
         elif choice == '6':
             fix_time_display()
+        elif choice == '7':
+            settings['left_mode'] = 'battery' if settings['left_mode'] == 'cpu' else 'cpu'
+            save_settings()
+            print(f"✓ Left LED will show {'per-core CPU load' if settings['left_mode'] == 'cpu' else 'battery level'}")
+            time.sleep(1)
+        elif choice == '8':
+            try:
+                val = int(input("Seconds blank/unchanged before modules sleep (0=never): "))
+                settings['module_sleep_timeout'] = max(0, val)
+                save_settings()
+                print(f"✓ Module sleep set to {settings['module_sleep_timeout']}s")
+                time.sleep(1)
+            except ValueError:
+                print("Invalid number")
+                time.sleep(1)
+        elif choice == '9':
+            try:
+                val = float(input("CPU budget on battery in % of one core (0=turn eco mode off): "))
+                settings['eco_mode'] = val > 0
+                if val > 0:
+                    settings['eco_cpu_budget'] = max(0.1, val)
+                save_settings()
+                if settings['eco_mode']:
+                    print(f"✓ Eco mode on - throttles fps, pulse and sensors above {settings['eco_cpu_budget']}% CPU")
+                else:
+                    print("✓ Eco mode off")
+                time.sleep(1)
+            except ValueError:
+                print("Invalid number")
+                time.sleep(1)
+        elif choice == '10':
+            settings['notifications_enabled'] = not settings['notifications_enabled']
+            save_settings()
+            if settings['notifications_enabled']:
+                print("✓ Notifications will scroll across the LEDs")
+            else:
+                print("✓ Notifications will no longer be shown")
+            time.sleep(1)
+        elif choice == '11':
+            cycle = {'fade': 'wipe', 'wipe': 'off'}
+            settings['transition'] = cycle.get(settings['transition'], 'fade')
+            save_settings()
+            if settings['transition'] == 'off':
+                print("✓ Display modes will switch instantly")
+            else:
+                print(f"✓ Display modes will {settings['transition']} over {settings['transition_frames']} frames")
+            time.sleep(1)
 
 def music_settings_menu():
     """Music settings menu"""
@@ -998,11 +4860,14 @@ def music_settings_menu():
         print("1. Scroll Speed: ", settings['music_scroll_speed'])
         print("2. Test Spotify Connection")
         print("3. Music Display Mode (Test)")
+        visualizer = {'spectrum': 'SPECTRUM', 'span': 'ARTIST/TITLE ACROSS BOTH',
+                      'art': 'ALBUM ART'}.get(settings['music_visualizer'], 'ARTIST/TITLE')
+        print(f"4. Right LED While Playing: {visualizer}")
         print("0. Back to main menu")
         print("="*50)
         print("Music mode is automatic - when Spotify plays:")
         print("• Left LED = Track progress bar")
-        print("• Right LED = Artist/song scrolling")
+        print("• Right LED = Artist/song scrolling (or audio spectrum / album art)")
         
         choice = input("Select option: ").strip()
         
@@ -1022,6 +4887,19 @@ def music_settings_menu():
             test_spotify_connection()
         elif choice == '3':
             music_display_mode()
+        elif choice == '4':
+            cycle = {'text': 'spectrum', 'spectrum': 'span', 'span': 'art'}
+            settings['music_visualizer'] = cycle.get(settings['music_visualizer'], 'text')
+            save_settings()
+            if settings['music_visualizer'] == 'spectrum':
+                print("✓ Right LED will show an audio spectrum (from the PipeWire/PulseAudio monitor)")
+            elif settings['music_visualizer'] == 'span':
+                print("✓ Artist and title will scroll across both modules, with progress along the bottom")
+            elif settings['music_visualizer'] == 'art':
+                print("✓ Right LED will show a dithered album art thumbnail (local covers only)")
+            else:
+                print("✓ Right LED will scroll artist and title")
+            time.sleep(1)
 
 def test_spotify_connection():
     """Test Spotify connection"""
@@ -1065,15 +4943,12 @@ def music_display_mode():
             music_matrix = create_music_display(music_info, scroll_offset)
             
             brightness_scale = settings['time_brightness'] / 255.0
-            for col in range(TIME_WIDTH):
-                column_data = [music_matrix[row][col] for row in range(TIME_HEIGHT)]
-                send_column(col, column_data, ser_time, brightness_scale)
-            send_flush(ser_time)
+            show_frame(ser_time, matrix_to_columns(music_matrix), brightness_scale)
             
             # Update scroll
             if music_info and music_info.get('artist', '') != '':
                 scroll_offset += settings['music_scroll_speed']
-                if scroll_offset > len(f"{music_info['artist']} - {music_info['track']}") * 6:
+                if scroll_offset > music_text_height(music_info):
                     scroll_offset = -TIME_HEIGHT
             
             time.sleep(0.2)  # 5 FPS for smooth scrolling
@@ -1111,11 +4986,10 @@ def fix_time_display():
         
         # Step 2: Test with simple pattern
         print("2. Testing with simple pattern...")
+        columns = [[0] * TIME_HEIGHT for _ in range(TIME_WIDTH)]
         for col in range(3, 6):  # Center columns
-            column_data = [0] * TIME_HEIGHT
-            column_data[TIME_HEIGHT//2] = MAX_BRIGHT  # Single dot in middle
-            send_column(col, column_data, ser_time, 1.0)
-        send_flush(ser_time)
+            columns[col][TIME_HEIGHT//2] = MAX_BRIGHT  # Single dot in middle
+        show_frame(ser_time, columns)
         time.sleep(1)
         
         # Step 3: Clear again
@@ -1127,10 +5001,7 @@ def fix_time_display():
         print("4. Showing test time...")
         test_matrix = create_time_display(5328)  # 88:48
         brightness_scale = settings['time_brightness'] / 255.0
-        for col in range(TIME_WIDTH):
-            column_data = [test_matrix[row][col] for row in range(TIME_HEIGHT)]
-            send_column(col, column_data, ser_time, brightness_scale)
-        send_flush(ser_time)
+        show_frame(ser_time, matrix_to_columns(test_matrix), brightness_scale)
         
         print("✓ Time display reset complete")
         print("The right LED should now show '88:48'")
@@ -1228,9 +5099,7 @@ def test_battery_brightness():
         print("Testing battery display...")
         columns = create_battery_frame(75, None, 0)  # 75% battery
         brightness_scale = settings['battery_brightness'] / 255.0
-        for col in range(WIDTH):
-            send_column(col, columns[col], ser, brightness_scale)
-        send_flush(ser)
+        show_frame(ser, columns, brightness_scale)
         print(f"Battery display showing at {int((settings['battery_brightness']/255)*100)}% brightness")
         input("Press Enter to continue...")
         # Keep the current display instead of clearing
@@ -1243,10 +5112,7 @@ def test_time_brightness():
         print("Testing time display...")
         test_matrix = create_time_display(5328)  # 88:48
         brightness_scale = settings['time_brightness'] / 255.0
-        for col in range(TIME_WIDTH):
-            column_data = [test_matrix[row][col] for row in range(TIME_HEIGHT)]
-            send_column(col, column_data, ser_time, brightness_scale)
-        send_flush(ser_time)
+        show_frame(ser_time, matrix_to_columns(test_matrix), brightness_scale)
         print(f"Time display showing at {int((settings['time_brightness']/255)*100)}% brightness")
         input("Press Enter to continue...")
         # Keep the current display instead of clearing
@@ -1264,6 +5130,8 @@ def show_about():
     print()
     print(f"Battery port: {ser.port if ser else 'Not connected'}")
     print(f"Time port: {ser_time.port if ser_time else 'Not connected'}")
+    for device in device_pool.extras():
+        print(f"Extra module: {device.serial_port.port} ({device.role})")
     print()
     print("Features:")
     print("• Battery level display with pulse animation")
@@ -1282,6 +5150,7 @@ def show_settings_file():
     print()
     
     try:
+        settings_store.flush()  # Make sure queued changes are on disk before showing it
         if os.path.exists(SETTINGS_FILE):
             with open(SETTINGS_FILE, 'r') as f:
                 content = f.read()
@@ -1299,38 +5168,49 @@ def show_settings_file():
     
     input("\nPress Enter to continue...")
 
-def force_dim_now():
-    """Immediately dim both displays to the auto-dim level"""
-    global last_activity_time
+def force_dim_now(cached=False):
+    """Immediately dim both displays to the auto-dim level (until the next activity)
+
+    cached is passed on to apply_brightness_immediately().
+    """
+    global forced_dim
     
     if settings['dim_timeout'] == 0:
         print("Auto-dim is disabled - cannot force dim")
         return
     
-    # Set activity time far in the past to trigger dimming
-    last_activity_time = time.time() - (settings['dim_timeout'] + 10)
+    forced_dim = True
     
     # Apply dimming to both displays immediately
     try:
         if ser and settings['battery_enabled']:
-            apply_brightness_immediately("battery")
+            apply_brightness_immediately("battery", cached)
         if ser_time and settings['time_enabled']:
-            apply_brightness_immediately("time")
+            apply_brightness_immediately("time", cached)
     except Exception as e:
         print(f"Error forcing dim: {e}")
 
-def check_dim_timeout():
+def check_dim_timeout(config=None):
     """Check if displays should be dimmed due to inactivity"""
-    if settings['dim_timeout'] > 0:
-        time_since_activity = time.time() - last_activity_time
-        if time_since_activity > settings['dim_timeout']:
+    if config is None:
+        config = render_config
+    if config.dim_timeout > 0:
+        time_since_activity = clock.time() - last_activity_time
+        if forced_dim or idle_hint or time_since_activity > config.dim_timeout:
             # Debug info
-            current_dim_level = settings['auto_dim_level']
+            current_dim_level = round(config.dim_factor * 100)
             if current_dim_level < 20:
-                print(f"🌙 Auto-dim active: dimmed to {current_dim_level}% (very dim - may appear off)")
-            return settings['auto_dim_level'] / 100.0
+                log('info', f"Auto-dim active: dimmed to {current_dim_level}% (very dim - may appear off)",
+                    key='auto-dim')
+            return config.dim_factor
     return 1.0
 
+def gauge_fill(fraction, rows):
+    """Split a 0-1 fill over `rows` rows into (full rows, fraction of the next row)"""
+    fill_level = max(0.0, min(1.0, fraction)) * rows
+    full_rows = math.floor(fill_level)
+    return full_rows, fill_level - full_rows
+
 def compute_multiplier(r, c, sigma, min_m):
     if c is None:
         return 1.0
@@ -1339,9 +5219,7 @@ def compute_multiplier(r, c, sigma, min_m):
 
 def create_battery_frame(p, c, pulse_fade):
     columns = []
-    fill_level = (p / 100.0) * 30  # 30 rows (2 to 32) for 0-100%
-    full_rows = math.floor(fill_level)
-    partial_fraction = fill_level - full_rows
+    full_rows, partial_fraction = gauge_fill(p / 100.0, 30)  # 30 rows (2 to 32) for 0-100%
     partial_row = 32 - full_rows if full_rows < 30 else None
 
     for col in range(WIDTH):
@@ -1362,7 +5240,7 @@ def create_battery_frame(p, c, pulse_fade):
                     if col == 4:
                         fade_factor = min(1.0, partial_fraction / 0.33)  # 0 to 0.33
                     elif col in (3, 5):
-                        fade_factor = max(0.0, (partial_fraction - 0.33) / 0.33)  # 0.33 to 0.66
+                        fade_factor = min(1.0, max(0.0, (partial_fraction - 0.33) / 0.33))  # 0.33 to 0.66
                     elif col in (2, 6):
                         fade_factor = max(0.0, (partial_fraction - 0.66) / 0.34)  # 0.66 to 1.0
                     column[row] = int(round(MAX_BRIGHT * fade_factor))
@@ -1515,36 +5393,88 @@ load_settings()
 # Set startup brightness from saved settings
 settings['battery_brightness'] = settings.get('startup_battery_brightness', 255)
 settings['time_brightness'] = settings.get('startup_time_brightness', 255)
+publish_render_config()
 
 print(f"🔆 Startup brightness: Battery={settings['battery_brightness']}, Time={settings['time_brightness']}")
 
-# Initialize last_activity_time based on start_dimmed setting
+# Initialize dim state based on start_dimmed setting
+register_activity()
 if settings.get('start_dimmed', False) and settings['dim_timeout'] > 0:
-    # Start already dimmed by setting activity time in the past
-    last_activity_time = time.time() - (settings['dim_timeout'] + 10)
+    # Start already dimmed until the first user activity
+    forced_dim = True
     print(f"🌙 Auto-dim active: will dim to {settings['auto_dim_level']}% after inactivity")
-else:
-    # Start at full brightness
-    last_activity_time = time.time()
 
 # Main program
 if __name__ == "__main__":
+    if cli_args.replay:
+        replay_recording(cli_args.replay, {d.device_id: d.serial_port for d in device_pool.devices},
+                         cli_args.max_speed)
+        sys.exit(0)
+    if cli_args.record:
+        frame_recorder = FrameRecorder(cli_args.record)
+        print(f"⏺ Recording frames to {cli_args.record}")
+    if cli_args.simulate is not None:
+        tracks = [("Simulated Artist", "A Rather Long Track Title For Scrolling", 240.0)]
+        print(f"⏩ Simulating {cli_args.simulate:.0f}s at {cli_args.watts:g} W...")
+        stats = run_simulation(cli_args.simulate, SimulatedBattery(discharge_watts=cli_args.watts),
+                               SimulatedPlayer(tracks), cli_args.speed)
+        if frame_recorder is not None:
+            frame_recorder.close()
+        print(json.dumps(stats))
+        sys.exit(0)
+    # Real user activity (input devices / logind) for auto-dim
+    idle_watcher = IdleWatcher(default_idle_sources())
     try:
+        # Pick up external edits to the settings file while running
+        settings_store.start_watching(on_reload=publish_render_config)
+        # Accept commands from scripts / keyboard shortcuts
+        control_server.start()
+        # Latest battery/music state for status bars (`--state`)
+        try:
+            state_publisher.open()
+        except OSError as e:
+            print(f"Could not create state snapshot {STATE_FILE}: {e}")
+        idle_watcher.start()
         # Show main menu - this is the only interface
+        interactive_menu = True
         show_main_menu()
     except KeyboardInterrupt:
         print("\nExiting...")
     finally:
         # Clean shutdown
+        if frame_recorder is not None:
+            frame_recorder.close()
+        idle_watcher.stop()
+        control_server.stop()
+        state_publisher.close()
+        try:
+            log_ring.flush(settings['log_target'])
+        except OSError:
+            pass
+        settings_store.stop_watching()
+        try:
+            settings_store.flush()
+        except Exception as e:
+            print(f"❌ Error saving settings: {e}")
         try:
             if ser:
                 clear_all_leds(ser, WIDTH, HEIGHT)
+                module_power[ser].sleep()
                 ser.close()
         except:
             pass
         try:
             if ser_time:
                 clear_all_leds(ser_time, TIME_WIDTH, TIME_HEIGHT)
+                module_power[ser_time].sleep()
                 ser_time.close()
         except:
             pass
+        device_pool.close()
+        for device in device_pool.extras():
+            try:
+                clear_all_leds(device.serial_port, WIDTH, HEIGHT)
+                module_power[device.serial_port].sleep()
+                device.serial_port.close()
+            except:
+                pass